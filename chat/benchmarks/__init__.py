@@ -0,0 +1,16 @@
+"""
+benchmarks
+
+Micro-benchmarks for the chat delivery pipeline. Each module exposes
+``add_arguments(parser)`` and an async ``run(options)`` returning a dict
+of results, and is run with ``python manage.py run_chat_benchmark <name>``.
+"""
+
+BENCHMARKS = {
+    "auth": "chat.benchmarks.auth",
+    "delivery": "chat.benchmarks.delivery",
+    "frames": "chat.benchmarks.frames",
+    "publisher": "chat.benchmarks.publisher",
+    "sharding": "chat.benchmarks.sharding",
+    "subscriber": "chat.benchmarks.subscriber",
+}
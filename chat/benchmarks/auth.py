@@ -0,0 +1,90 @@
+"""
+auth.py
+
+Measures how fast the WebSocket JWT middleware lets connections in
+during a reconnect storm (the same tokens presented again and again):
+the former path (validate, decode again, look the user up), a single
+verify-and-decode with the user looked up every time, and the same with
+the token cache. Needs the database, not the broker.
+"""
+
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.test.utils import override_settings
+from jwt import decode as jwt_decode
+from rest_framework_simplejwt.tokens import AccessToken, UntypedToken
+
+from chat.service.middlewares import JWTAuthAsyncMiddleware
+from user.models import User
+
+
+def add_arguments(parser):
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+
+
+async def accept(scope, receive, send):
+    pass
+
+
+class FormerJWTAuthAsyncMiddleware(JWTAuthAsyncMiddleware):
+    """The middleware as it was: the token is decoded twice, no cache."""
+
+    async def __call__(self, scope, receive, send):
+        token = scope["query_string"].decode().split("=", 1)[1]
+        UntypedToken(token)
+        payload = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        scope["user"] = await self.get_user(user_id=payload["user_id"])
+        return await self.app(scope, receive, send)
+
+
+@database_sync_to_async
+def create_users(count):
+    prefix = uuid.uuid4().hex
+    return [
+        User.objects.create_user(email=f"benchmark-{prefix}-{i}@example.com")
+        for i in range(count)
+    ]
+
+
+@database_sync_to_async
+def delete_users(users):
+    User.objects.filter(id__in=[user.id for user in users]).delete()
+
+
+async def connections_per_sec(middleware, tokens, count):
+    start = time.perf_counter()
+    for i in range(count):
+        scope = {
+            "type": "websocket",
+            "headers": [],
+            "query_string": f"token={tokens[i % len(tokens)]}".encode(),
+        }
+        await middleware(scope, None, None)
+        assert scope["user"].is_authenticated
+    return round(count / (time.perf_counter() - start), 1)
+
+
+async def run(options):
+    users = await create_users(options["users"])
+    tokens = [str(AccessToken.for_user(user)) for user in users]
+    count = options["connections"]
+    try:
+        former = await connections_per_sec(
+            FormerJWTAuthAsyncMiddleware(accept), tokens, count
+        )
+        with override_settings(CHAT_TOKEN_CACHE_TTL=0):
+            verify_once = await connections_per_sec(
+                JWTAuthAsyncMiddleware(accept), tokens, count
+            )
+        cached = await connections_per_sec(JWTAuthAsyncMiddleware(accept), tokens, count)
+    finally:
+        await delete_users(users)
+    return {
+        "former_conn_per_sec": former,
+        "verify_once_conn_per_sec": verify_once,
+        "cached_conn_per_sec": cached,
+    }
@@ -0,0 +1,83 @@
+"""
+delivery.py
+
+Measures end-to-end latency from a REST send (``send_message``) to the
+event reaching a WebSocket consumer's channel, for each delivery mode:
+"broker" (outbox relay -> RabbitMQ -> subscriber -> channel layer) and
+"direct" (straight to the channel layer). The broker path needs
+``run_outbox_relay`` and ``run_chat_subscriber`` running alongside.
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.test.utils import override_settings
+
+from chat.entity.chat_models import ChatRoom
+from chat.service.message_service import send_message
+from user.models import User
+
+
+def add_arguments(parser):
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["broker", "direct"])
+    parser.add_argument("--timeout", type=float, default=5.0)
+
+
+@database_sync_to_async
+def create_fixtures():
+    user = User.objects.create_user(
+        email=f"benchmark-{uuid.uuid4().hex}@example.com", password=None
+    )
+    chatroom = ChatRoom.objects.create(name="Delivery benchmark", admin=user)
+    chatroom.members.add(user)
+    return user, chatroom
+
+
+@database_sync_to_async
+def delete_fixtures(user, chatroom):
+    chatroom.delete()
+    user.delete()
+
+
+async def measure(layer, channel, user, chatroom, options):
+    latencies = []
+    for index in range(options["count"]):
+        content = f"benchmark {index}"
+        start = time.perf_counter()
+        await database_sync_to_async(send_message)(content, user, chatroom)
+        while True:
+            event = await asyncio.wait_for(
+                layer.receive(channel), options["timeout"]
+            )
+            if event["data"]["message"] == content:
+                break
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+async def run(options):
+    user, chatroom = await create_fixtures()
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    group = f"chat_{chatroom.id}"
+    await layer.group_add(group, channel)
+
+    results = {}
+    try:
+        for mode in options["modes"]:
+            with override_settings(CHAT_DELIVERY_MODE=mode):
+                stats = await measure(layer, channel, user, chatroom, options)
+            results.update({f"{mode}_{key}": value for key, value in stats.items()})
+    finally:
+        await layer.group_discard(group, channel)
+        await delete_fixtures(user, chatroom)
+    return results
@@ -0,0 +1,68 @@
+"""
+frames.py
+
+Measures the CPU time one broadcast costs a node at different room
+sizes: every consumer encoding the event for its own socket, against
+the frame being encoded once per group_send and forwarded as is. Needs
+no broker or database: consumers and their sockets are simulated.
+"""
+
+import json
+import time
+
+from django.test.utils import override_settings
+
+from chat.service.consumers import ChatConsumer
+from chat.service.frames import chat_event, orjson
+
+
+def add_arguments(parser):
+    parser.add_argument("--room-sizes", type=int, nargs="+", default=[16, 256, 1024])
+    parser.add_argument("--broadcasts", type=int, default=200)
+    parser.add_argument("--message-size", type=int, default=200)
+
+
+class LastFrame:
+    """Send queue that only remembers the last frame queued."""
+
+    def __init__(self):
+        self.frame = None
+
+    def put(self, frame, ephemeral=True):
+        self.frame = frame
+
+
+class SimulatedConsumer(ChatConsumer):
+    """ChatConsumer without a socket behind its send queue."""
+
+    def __init__(self):
+        self.outbound = LastFrame()
+
+
+async def broadcast_cpu_us(consumers, options, preencoded):
+    data = {
+        "purpose": "new_chat_message",
+        "message": "x" * options["message_size"],
+        "sender": "benchmark",
+        "durability": "persisted",
+    }
+    with override_settings(CHAT_PREENCODED_FRAMES=preencoded):
+        start = time.process_time()
+        for _ in range(options["broadcasts"]):
+            event = chat_event("chat.message", data)
+            for consumer in consumers:
+                await consumer.chat_message(event)
+        elapsed = time.process_time() - start
+    assert json.loads(consumers[0].outbound.frame)["data"] == data
+    return round(elapsed / options["broadcasts"] * 1_000_000, 1)
+
+
+async def run(options):
+    results = {"encoder": "orjson" if orjson is not None else "json"}
+    for size in options["room_sizes"]:
+        consumers = [SimulatedConsumer() for _ in range(size)]
+        per_consumer = await broadcast_cpu_us(consumers, options, False)
+        encode_once = await broadcast_cpu_us(consumers, options, True)
+        results[f"room_{size}_per_consumer_cpu_us"] = per_consumer
+        results[f"room_{size}_encode_once_cpu_us"] = encode_once
+    return results
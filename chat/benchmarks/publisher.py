@@ -0,0 +1,95 @@
+"""
+publisher.py
+
+Compares messages/sec of the pooled ``ChatPublisher`` (one confirmed
+publish at a time, and buffered into batches) against opening a new
+connection, channel and exchange declaration for every message.
+Requires a running RabbitMQ broker.
+"""
+
+import asyncio
+import json
+import time
+
+from aio_pika import DeliveryMode, Message, connect
+from django.conf import settings
+
+from chat.service import topology
+from chat.service.publisher import ChatPublisher
+
+
+def add_arguments(parser):
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+
+
+async def publish_with_new_connection(data):
+    """
+    Publish a message the way it was done before pooling.
+
+    Args:
+        data (dict): The data to be published.
+
+    Returns:
+        None
+    """
+    connection = await connect(settings.RABBITMQ_URL)
+    async with connection:
+        channel = await connection.channel()
+        exchange = await channel.declare_exchange(
+            settings.CHAT_EXCHANGE_NAME, topology.exchange_type()
+        )
+        message = Message(
+            json.dumps(data).encode(), delivery_mode=DeliveryMode.PERSISTENT
+        )
+        await exchange.publish(
+            message, routing_key=topology.routing_key(data.get("chat_id"))
+        )
+
+
+async def measure(publish, count, concurrency):
+    """
+    Publish ``count`` messages with at most ``concurrency`` in flight.
+
+    Args:
+        publish: Coroutine function taking the message data.
+        count (int): Number of messages to publish.
+        concurrency (int): Maximum number of concurrent publishes.
+
+    Returns:
+        float: Messages published per second.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def publish_one(index):
+        async with semaphore:
+            # The subscriber ignores purposes it does not know about
+            await publish({"purpose": "benchmark", "index": index})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(publish_one(i) for i in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+async def run(options):
+    count, concurrency = options["count"], options["concurrency"]
+    publisher = ChatPublisher()
+    # Warm the pools so connection set-up is not part of the measurement
+    await publisher.publish({"purpose": "benchmark", "index": -1})
+
+    async def publish_buffered(data):
+        await asyncio.wrap_future(publisher.publish_buffered(data))
+
+    try:
+        pooled = await measure(publisher.publish, count, concurrency)
+        batched = await measure(publish_buffered, count, concurrency)
+    finally:
+        await publisher.close()
+    unpooled = await measure(publish_with_new_connection, count, concurrency)
+    return {
+        "connect_per_call_msgs_per_sec": round(unpooled, 1),
+        "pooled_msgs_per_sec": round(pooled, 1),
+        "batched_msgs_per_sec": round(batched, 1),
+        "pooled_speedup": round(pooled / unpooled, 2),
+        "batched_speedup": round(batched / unpooled, 2),
+    }
@@ -0,0 +1,116 @@
+"""
+sharding.py
+
+Load test of sharded delivery: publishes events for many chatrooms,
+then drains them with 1..N shard consumers (each with prefetch 1 and a
+simulated channel layer delay) and reports delivery throughput per
+shard count. Runs against a throwaway topic exchange on the local
+RabbitMQ broker.
+"""
+
+import asyncio
+import json
+import time
+
+from aio_pika import DeliveryMode, Message, connect
+from django.conf import settings
+from django.test.utils import override_settings
+
+from chat.service import topology
+from chat.service.sharding import ShardBindings
+
+
+def add_arguments(parser):
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+
+
+async def drain(connection, shards, count, delay):
+    """
+    Consume ``count`` events from every shard queue.
+
+    Args:
+        connection: The broker connection.
+        shards (int): The number of shards.
+        count (int): The number of events to wait for.
+        delay (float): Simulated delivery time of one event, in seconds.
+
+    Returns:
+        float: Events delivered per second.
+    """
+    done = asyncio.Event()
+    delivered = 0
+
+    async def on_message(message):
+        nonlocal delivered
+        async with message.process():
+            await asyncio.sleep(delay)
+        delivered += 1
+        if delivered == count:
+            done.set()
+
+    start = time.perf_counter()
+    for shard_id in range(shards):
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=1)
+        queue = await channel.get_queue(topology.shard_queue_name(shard_id))
+        await queue.consume(on_message)
+    await done.wait()
+    return count / (time.perf_counter() - start)
+
+
+async def measure(connection, shards, options):
+    channel = await connection.channel()
+    exchange = await channel.declare_exchange(
+        settings.CHAT_EXCHANGE_NAME, topology.exchange_type(), auto_delete=True
+    )
+    bindings = ShardBindings(channel, exchange, shards, list(range(shards)))
+    queues = await bindings.declare()
+    # The exchange is our own, so there are no previous owners to wait for
+    for shard_id in range(shards):
+        await bindings.bind(shard_id)
+    for queue in queues:
+        await queue.purge()
+
+    await asyncio.gather(
+        *(
+            exchange.publish(
+                Message(
+                    json.dumps({"chat_id": i % options["rooms"]}).encode(),
+                    delivery_mode=DeliveryMode.PERSISTENT,
+                ),
+                routing_key=topology.routing_key(i % options["rooms"]),
+            )
+            for i in range(options["count"])
+        )
+    )
+    try:
+        return await drain(
+            connection, shards, options["count"], options["delay_ms"] / 1000
+        )
+    finally:
+        for queue in queues:
+            await queue.delete(if_unused=False, if_empty=False)
+
+
+async def run(options):
+    results = {}
+    bench_exchange = f"{settings.CHAT_EXCHANGE_NAME}.bench"
+    with override_settings(
+        CHAT_EXCHANGE_NAME=bench_exchange, CHAT_EXCHANGE_TYPE="topic"
+    ):
+        for shards in options["shards"]:
+            connection = await connect(settings.RABBITMQ_URL)
+            async with connection:
+                results[f"shards_{shards}_msgs_per_sec"] = round(
+                    await measure(connection, shards, options), 1
+                )
+
+    baseline = results[f"shards_{options['shards'][0]}_msgs_per_sec"]
+    for shards in options["shards"]:
+        results[f"shards_{shards}_scaling"] = round(
+            results[f"shards_{shards}_msgs_per_sec"] / baseline, 2
+        )
+    return results
@@ -0,0 +1,119 @@
+"""
+subscriber.py
+
+Shows head-of-line blocking in the subscriber: one chatroom whose
+channel layer sends are slow, among many fast ones. Messages arrive at
+a fixed rate and latency is measured from arrival to ack. Compares
+handling messages one at a time (the former prefetch 1 behaviour) with
+the keyed dispatcher and a prefetch window. Needs no broker: messages and the
+channel layer are simulated in memory.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+
+from chat.service.dispatcher import KeyedDispatcher
+from chat.service.subscriber import dispatch_key, on_message
+
+
+def add_arguments(parser):
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--prefetch", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=500.0, help="arrivals/sec")
+    parser.add_argument("--fast-ms", type=float, default=1.0)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+
+
+class SlowChannelLayer:
+    """Channel layer whose sends to room 0 take much longer than the rest."""
+
+    def __init__(self, fast, slow):
+        self.fast = fast
+        self.slow = slow
+
+    async def group_send(self, group, message):
+        await asyncio.sleep(self.slow if group == "chat_0" else self.fast)
+
+
+class SimulatedMessage:
+    """In-memory stand-in for an incoming broker message."""
+
+    def __init__(self, chat_id, window, arrived_at):
+        self.body = json.dumps(
+            {
+                "purpose": "new_chat_message",
+                "chat_id": chat_id,
+                "message": "hello",
+                "sender": "benchmark",
+            }
+        ).encode()
+        self.routing_key = ""
+        self.chat_id = chat_id
+        self.window = window
+        self.arrived_at = arrived_at
+        self.latency = None
+
+    @asynccontextmanager
+    async def process(self, **kwargs):
+        yield
+        self.latency = time.perf_counter() - self.arrived_at
+        # Acking frees a slot in the prefetch window
+        self.window.release()
+
+
+async def deliver(options, prefetch, handle):
+    """
+    Feed messages arriving at a fixed rate through ``handle``, with at
+    most ``prefetch`` of them unacked.
+
+    Returns:
+        list: The delivered messages.
+    """
+    window = asyncio.Semaphore(prefetch)
+    messages = []
+    start = time.perf_counter()
+    for i in range(options["count"]):
+        arrived_at = start + i / options["rate"]
+        await asyncio.sleep(max(0, arrived_at - time.perf_counter()))
+        await window.acquire()
+        message = SimulatedMessage(i % options["rooms"], window, arrived_at)
+        messages.append(message)
+        await handle(message)
+    return messages
+
+
+def summarise(messages, elapsed):
+    fast = [m.latency * 1000 for m in messages if m.chat_id != 0]
+    return {
+        "msgs_per_sec": round(len(messages) / elapsed, 1),
+        "fast_room_p50_ms": round(statistics.median(fast), 2),
+        "fast_room_max_ms": round(max(fast), 2),
+    }
+
+
+async def run(options):
+    layer = SlowChannelLayer(options["fast_ms"] / 1000, options["slow_ms"] / 1000)
+    handler = partial(on_message, channel_layer=layer)
+
+    start = time.perf_counter()
+    sequential = await deliver(options, 1, handler)
+    sequential_stats = summarise(sequential, time.perf_counter() - start)
+
+    dispatcher = KeyedDispatcher(handler)
+
+    async def dispatch(message):
+        dispatcher.submit(dispatch_key(message), message)
+
+    start = time.perf_counter()
+    keyed = await deliver(options, options["prefetch"], dispatch)
+    await dispatcher.join()
+    keyed_stats = summarise(keyed, time.perf_counter() - start)
+
+    results = {f"sequential_{k}": v for k, v in sequential_stats.items()}
+    results.update({f"keyed_{k}": v for k, v in keyed_stats.items()})
+    return results
@@ -27,18 +27,20 @@ from drf_spectacular.utils import (
 from chat.entity.chat_models import ChatRoom
 from chat.controller.serializers import (
     ChatRoomSerializer,
+    CompactChatRoomSerializer,
     CreateChatRoomSerializer,
+    MemberSerializer,
 )
 
-from chat.service.publisher import publish
 from chat.service.chatroom_service import (
     create_chatroom,
     list_chatrooms,
+    list_members,
     leave_chatroom,
     enter_chatroom,
 )
-
-from chat.service.publisher import publish
+from chat.service.membership import is_member
+from chat.utils.pagination import parse_limit
 
 
 @extend_schema_view(
@@ -121,16 +123,7 @@ class ChatRoomLeaveView(APIView):
         try:
             chatroom = leave_chatroom(user=user, chatroom=chatroom_id)
             if chatroom is not None:
-                data = {
-                    "purpose": "new_chat_message",
-                    "chat_id": chatroom_id,
-                    "message": f"{user.username} has left the chatroom",
-                    "sender": "WhatsApp MessengerBot",
-                }
-
-                # Publish this data to rabbitmq queue so it can
-                # be fetched and sent to the websocket room.
-                async_to_sync(publish)(data=data)
+                # The chatroom is notified through the outbox relay
                 return Response(
                     {"detail": f"{user.username} have left the chatroom"},
                     status=status.HTTP_200_OK,
@@ -189,28 +182,19 @@ class ChatRoomEnterView(APIView):
         try:
             # join current chatroom
             chatroom = enter_chatroom(user=user, chatroom=chatroom_id)
-            if chatroom is not None:
-                data = {
-                    "purpose": "new_chat_message",
-                    "chat_id": chatroom.id,
-                    "message": f"{user.username} just joined the Chatroom",
-                    "sender": "WhatsApp MessengerBot",
-                }
-
-                # Publish this data to rabbitmq queue so it can
-                # be fetched and sent to the websocket room.
-                async_to_sync(publish)(data=data)
+            if chatroom == "chatroom filled":
+                return Response(
+                    {"detail": "Maximum chatroom members exceeded."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            elif chatroom is not None:
+                # The chatroom is notified through the outbox relay
                 return Response(
                     {
                         "detail": f"You have successfully joined the chatroom: {chatroom.name}"
                     },
                     status=status.HTTP_200_OK,
                 )
-            elif chatroom == "chatroom filled":
-                return Response(
-                    {"detail": "Maximum chatroom members exceeded."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
             else:
                 return Response(
                     {"detail": "Chatroom already joined by you"},
@@ -232,10 +216,22 @@ class ChatRoomEnterView(APIView):
 @extend_schema_view(
     get=extend_schema(
         summary="List User's Chat Rooms",
-        description="List User's Chat Rooms",
+        description=(
+            "List a page of the user's chat rooms, most recently active "
+            "first, each with a preview of its latest message. Pass the "
+            "`before` cursor of a response to read the less recently "
+            "active page, and `compact=1` to leave out the members of "
+            "each room and keep only their `member_count`."
+        ),
         methods=["get"],
         operation_id="userChatRoomList",
         tags=["Chat"],
+        parameters=[
+            OpenApiParameter("compact", bool, description="Leave out the members"),
+            OpenApiParameter("before", str, description="Cursor of the less recent page"),
+            OpenApiParameter("after", str, description="Cursor of the more recent page"),
+            OpenApiParameter("limit", int, description="Page size"),
+        ],
         responses=ChatRoomSerializer,
     )
 )
@@ -256,15 +252,105 @@ class ChatRoomListView(APIView):
         """
         user = request.user
         try:
+            compact = request.query_params.get("compact") in ("1", "true")
+            limit = parse_limit(
+                request.query_params.get("limit"),
+                settings.CHAT_INBOX_PAGE_SIZE,
+                settings.CHAT_INBOX_PAGE_MAX_SIZE,
+            )
             # perform sql query to list chatrooms current user is a member of.
-            chatrooms = list_chatrooms(user=user)
+            page = list_chatrooms(
+                user=user,
+                compact=compact,
+                limit=limit,
+                before=request.query_params.get("before"),
+                after=request.query_params.get("after"),
+            )
 
-            serializer = self.serializer_class(chatrooms, many=True)
+            serializer_class = (
+                CompactChatRoomSerializer if compact else self.serializer_class
+            )
+            serializer = serializer_class(page.items, many=True)
+            return Response(
+                {
+                    "chatrooms": serializer.data,
+                    "cursors": {"before": page.before, "after": page.after},
+                },
+                status=status.HTTP_200_OK,
+            )
+        except ValueError as e:
             return Response(
-                {"chatrooms": serializer.data}, status=status.HTTP_200_OK
+                {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
             )
         except ChatRoom.DoesNotExist:
             return Response(
                 {"detail": "Chatroom not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+@extend_schema_view(
+    get=extend_schema(
+        summary="List the members of a chat room",
+        description=(
+            "This endpoint lists a page of the members of a chatroom, by "
+            "user id. Pass the `after` or `before` cursor of a response "
+            "to read the next or previous page."
+        ),
+        methods=["get"],
+        operation_id="chatRoomMemberList",
+        tags=["Chat"],
+        parameters=[
+            OpenApiParameter("before", str, description="Cursor of the previous page"),
+            OpenApiParameter("after", str, description="Cursor of the next page"),
+            OpenApiParameter("limit", int, description="Page size"),
+        ],
+        responses=MemberSerializer,
+    )
+)
+class ChatRoomMemberListView(APIView):
+    # Set permission classes and serializer class for the view
+    permission_classes = [IsAuthenticated]
+    serializer_class = MemberSerializer
+
+    def get(self, request, chatroom_id):
+        """
+        List a page of the members of a chatroom.
+
+        Args:
+            request: The HTTP request object.
+            chatroom_id: The ID of the chatroom.
+
+        Returns:
+            Response containing the members and the page cursors.
+        """
+        if not is_member(chatroom_id, request.user.id):
+            return Response(
+                {"detail": "You are not a member of this chatroom"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        try:
+            limit = parse_limit(
+                request.query_params.get("limit"),
+                settings.CHAT_MEMBER_PAGE_SIZE,
+                settings.CHAT_MEMBER_PAGE_MAX_SIZE,
+            )
+            page = list_members(
+                chatroom=chatroom_id,
+                limit=limit,
+                before=request.query_params.get("before"),
+                after=request.query_params.get("after"),
+            )
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.serializer_class(page.items, many=True)
+        return Response(
+            {
+                "detail": serializer.data,
+                "cursors": {"before": page.before, "after": page.after},
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -13,11 +13,13 @@ from rest_framework.permissions import IsAuthenticated
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from chat.entity.chat_models import Attachment, ChatRoom, Message
-from chat.service.publisher import publish
 from .serializers import CreateMessageSerializer, MessageSerializer
 from chat.entity.chat_models import attachment_location
 from chat.service.message_service import send_message, list_messages
+from chat.service.membership import is_member
 from chat.repository.message import save_attachment
+from chat.utils.pagination import parse_limit
+from django.conf import settings
 import logging
 from drf_spectacular.utils import (
     extend_schema,
@@ -30,10 +32,19 @@ from drf_spectacular.utils import (
 @extend_schema_view(
     get=extend_schema(
         summary="List messages in a chatroom",
-        description="This endpoint lists messages in a chatroom.",
+        description=(
+            "This endpoint lists a page of messages in a chatroom, the "
+            "newest ones by default. Pass the `before` or `after` cursor "
+            "of a response to read the older or newer page."
+        ),
         methods=["get"],
         operation_id="listChatMessages",
         tags=["Chat"],
+        parameters=[
+            OpenApiParameter("before", str, description="Cursor of the older page"),
+            OpenApiParameter("after", str, description="Cursor of the newer page"),
+            OpenApiParameter("limit", int, description="Page size"),
+        ],
         responses=MessageSerializer
     )
 )
@@ -53,9 +64,28 @@ class MessageListView(APIView):
             Response containing details of the chatroom messages.
         """
         try:
-            messages = list_messages(chatroom=chatroom_id)
-            serializer = self.serializer_class(messages, many=True)
-            return Response({"detail": serializer.data})
+            limit = parse_limit(
+                request.query_params.get("limit"),
+                settings.CHAT_MESSAGE_PAGE_SIZE,
+                settings.CHAT_MESSAGE_PAGE_MAX_SIZE,
+            )
+            page = list_messages(
+                chatroom=chatroom_id,
+                limit=limit,
+                before=request.query_params.get("before"),
+                after=request.query_params.get("after"),
+            )
+            serializer = self.serializer_class(page.items, many=True)
+            return Response(
+                {
+                    "detail": serializer.data,
+                    "cursors": {"before": page.before, "after": page.after},
+                }
+            )
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
         except ChatRoom.DoesNotExist:
             return Response(
                 {"error": "Chatroom not found"},
@@ -96,28 +126,22 @@ class SendMessageView(APIView):
         user = request.user
         try:
             chatroom = ChatRoom.objects.get(id=chatroom_id)
+            if not is_member(chatroom.id, user.id):
+                return Response(
+                    {"error": "You are not a member of this chatroom"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
             content = request.data.get("content", "")
             attachment = request.data.get("attachment", None)
 
+            # The broadcast is recorded in the outbox with the message and
+            # published by the outbox relay, off the request path.
             message = send_message(
-                content=content, sender=user, chatroom=chatroom
+                content=content,
+                sender=user,
+                chatroom=chatroom,
+                attachment=attachment,
             )
-            new_attachment = None
-            if message is not None:
-                if attachment is not None:
-                    new_attachment = save_attachment(attachment, message)
-
-            data = {
-                "purpose": "new_chat_message",
-                "chat_id": chatroom.id,
-                "message": message.content,
-                "file": new_attachment.file.url
-                if new_attachment is not None
-                else "",
-                "sender": user.username,
-            }
-
-            async_to_sync(publish)(data=data)
 
             serializer = MessageSerializer(message)
             return Response(
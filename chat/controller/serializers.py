@@ -5,11 +5,57 @@ This module defines serializers for ChatRoom and
 Message models in the chat application.
 """
 
+from django.conf import settings
 from rest_framework import serializers
-from chat.entity.chat_models import Attachment, ChatRoom, Message
+from chat.entity.chat_models import ChatRoom, Message
+from chat.repository.membership import MembershipRepository
 from asgiref.sync import async_to_sync
 
-class ChatRoomSerializer(serializers.ModelSerializer):
+class CompactChatRoomSerializer(serializers.ModelSerializer):
+    """
+    Serializer for ChatRoom model, without its members.
+
+    Attributes:
+        member_count (SerializerMethodField): Serializer method field
+        to retrieve the number of members of the chat room.
+        last_message (SerializerMethodField): Serializer method field
+        to retrieve a preview of the latest message of the chat room.
+
+    Meta:
+        model: The ChatRoom model.
+        exclude: "members".
+
+    Methods:
+        get_member_count: Method to retrieve the number of members.
+        get_last_message: Method to retrieve the latest message preview.
+    """
+    member_count = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChatRoom
+        exclude = ["members"]
+
+    def get_member_count(self, obj):
+        # Reads the count annotated by ChatRoomRepository.fetch_chatrooms
+        member_count = getattr(obj, "member_count", None)
+        if member_count is None:
+            member_count = MembershipRepository.count(obj.id)
+        return member_count
+
+    def get_last_message(self, obj):
+        # Reads the message selected by ChatRoomRepository.fetch_chatrooms
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            "id": message.id,
+            "content": message.content[: settings.CHAT_INBOX_PREVIEW_LENGTH],
+            "sender": message.sender.username,
+            "created_at": message.created_at,
+        }
+
+class ChatRoomSerializer(CompactChatRoomSerializer):
     """
     Serializer for ChatRoom model.
 
@@ -31,11 +77,23 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def get_members(self, obj):
-        data = []
-        if obj.members:
-            for member in obj.members.all():
-                data.append({"id": member.id, "username": member.username})
-        return data
+        # Reads the members prefetched by ChatRoomRepository.fetch_chatrooms
+        return [
+            {"id": member.id, "username": member.username}
+            for member in obj.members.all()
+        ]
+
+class MemberSerializer(serializers.Serializer):
+    """
+    Serializer for a chat room member, as read by
+    MembershipRepository.get_members.
+
+    Attributes:
+        id (IntegerField): The ID of the user.
+        username (CharField): The username of the user.
+    """
+    id = serializers.IntegerField(source="user_id")
+    username = serializers.CharField(source="user__username")
 
 class CreateChatRoomSerializer(serializers.ModelSerializer):
     """
@@ -77,10 +135,11 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ["id", "content", "sender", "chatroom", "attachment", "created_at"]
 
     def get_attachment(self, obj):
-        attachment = Attachment.objects.filter(message=obj).first()
-        if attachment is not None:
-            attachment_url = attachment.file.url
-            return attachment_url
+        # Reads the attachments prefetched by MessageRepository.get_messages,
+        # ordered by id, instead of querying them per message
+        attachments = obj.message_attachment.all()
+        if attachments:
+            return attachments[0].file.url
         return None
 
 class CreateMessageSerializer(serializers.Serializer):
@@ -0,0 +1,80 @@
+"""
+stats_controller.py
+
+This module defines API views exposing runtime counters of the chat
+WebSocket layer to administrators.
+"""
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    inline_serializer,
+)
+
+from chat.service import heartbeat, outbound
+
+
+@extend_schema_view(
+    get=extend_schema(
+        summary="WebSocket send queue counters",
+        description="Send queue depth and overflow counters of the "
+        "process serving the request.",
+        methods=["get"],
+        operation_id="chatSendQueueStats",
+        tags=["Chat"],
+        responses=inline_serializer(
+            name="SendQueueStats",
+            fields={"detail": serializers.DictField()},
+        ),
+    )
+)
+class SendQueueStatsView(APIView):
+    # Set permission classes for the view
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Get the send queue counters of this process.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response containing the counters.
+        """
+        return Response({"detail": outbound.stats.snapshot()})
+
+
+@extend_schema_view(
+    get=extend_schema(
+        summary="WebSocket connection counters",
+        description="Live and reaped WebSocket counters of the process "
+        "serving the request.",
+        methods=["get"],
+        operation_id="chatConnectionStats",
+        tags=["Chat"],
+        responses=inline_serializer(
+            name="ConnectionStats",
+            fields={"detail": serializers.DictField()},
+        ),
+    )
+)
+class ConnectionStatsView(APIView):
+    # Set permission classes for the view
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Get the WebSocket connection counters of this process.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response containing the counters.
+        """
+        return Response({"detail": heartbeat.stats.snapshot()})
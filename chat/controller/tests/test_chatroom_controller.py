@@ -1,9 +1,12 @@
+import base64
 import json
 import pytest
 from user.models import User
 from django.test import Client
 from rest_framework import status
+from rest_framework.test import APIClient
 from chat.entity.chat_models import ChatRoom
+from chat.repository.message import MessageRepository
 
 # Assuming that your Django app is named 'chat'
 from chat.controller.serializers import ChatRoomSerializer, CreateChatRoomSerializer
@@ -63,3 +66,92 @@ def test_chatroom_list_view(client, create_user, create_chatroom):
 
     assert response.status_code == status.HTTP_200_OK
     assert 'chatrooms' in response.data
+
+@pytest.mark.django_db
+def test_chatroom_list_view_prefetches_members(create_user, django_assert_num_queries):
+    others = [User.objects.create_user(email=f'{i}@test.com', username=f'user{i}') for i in range(3)]
+    for i in range(5):
+        room = ChatRoom.objects.create(name=f'Room {i}')
+        room.members.add(create_user, *others)
+    client = APIClient()
+    client.force_authenticate(user=create_user)
+
+    with django_assert_num_queries(2):
+        response = client.get('/api/v1/chat/chatrooms/')
+
+    assert len(response.data['chatrooms']) == 5
+    assert all(len(room['members']) == 4 for room in response.data['chatrooms'])
+    assert all(room['member_count'] == 4 for room in response.data['chatrooms'])
+
+    with django_assert_num_queries(1):
+        response = client.get('/api/v1/chat/chatrooms/', {'compact': 1})
+
+    assert all('members' not in room for room in response.data['chatrooms'])
+    assert all(room['member_count'] == 4 for room in response.data['chatrooms'])
+
+
+@pytest.mark.django_db
+def test_chatroom_member_list_view_pages_by_user_id(create_user, create_chatroom):
+    others = [User.objects.create_user(email=f'{i}@test.com', username=f'user{i}') for i in range(4)]
+    create_chatroom.members.add(create_user, *others)
+    client = APIClient()
+    client.force_authenticate(user=create_user)
+    url = f'/api/v1/chat/chatrooms/{create_chatroom.id}/members/'
+
+    response = client.get(url, {'limit': 2})
+    assert response.data['cursors']['before'] is None
+    seen = [m['username'] for m in response.data['detail']]
+    while response.data['cursors']['after']:
+        response = client.get(url, {'limit': 2, 'after': response.data['cursors']['after']})
+        seen += [m['username'] for m in response.data['detail']]
+
+    assert seen == ['testuser'] + [f'user{i}' for i in range(4)]
+
+    client.force_authenticate(user=User.objects.create_user(email='x@test.com', username='outsider'))
+    assert client.get(url).status_code == 403
+
+
+@pytest.mark.django_db
+def test_chatroom_list_view_orders_by_latest_activity(create_user):
+    rooms = [ChatRoom.objects.create(name=f'Room {i}') for i in range(3)]
+    for room in rooms:
+        room.members.add(create_user)
+    MessageRepository.create_message('in room 0', create_user, rooms[0])
+    MessageRepository.create_message('in room 1', create_user, rooms[1])
+    client = APIClient()
+    client.force_authenticate(user=create_user)
+
+    response = client.get('/api/v1/chat/chatrooms/', {'limit': 2})
+    assert [room['name'] for room in response.data['chatrooms']] == ['Room 1', 'Room 0']
+    assert response.data['chatrooms'][0]['last_message']['content'] == 'in room 1'
+    assert response.data['chatrooms'][0]['last_message']['sender'] == 'testuser'
+
+    response = client.get('/api/v1/chat/chatrooms/', {'limit': 2, 'before': response.data['cursors']['before']})
+    assert [room['name'] for room in response.data['chatrooms']] == ['Room 2']
+    assert response.data['chatrooms'][0]['last_message'] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('values', [
+    b'["x", 1]', b'[{}, 1]', b'[[1], 1]', b'["2020-01-01T00:00:00", {"a": 1}]', b'["2020-01-01T00:00:00", 1.5]',
+])
+def test_chatroom_list_view_rejects_bad_cursor(create_user, values):
+    client = APIClient()
+    client.force_authenticate(user=create_user)
+    cursor = base64.urlsafe_b64encode(values).decode()
+
+    assert client.get('/api/v1/chat/chatrooms/', {'before': cursor}).status_code == 400
+    assert client.get('/api/v1/chat/chatrooms/', {'after': cursor}).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('values', [b'["x"]', b'[{}]', b'[[1]]', b'[1.5]', b'[true]', b'[1, 2]'])
+def test_chatroom_member_list_view_rejects_bad_cursor(create_user, create_chatroom, values):
+    create_chatroom.members.add(create_user)
+    client = APIClient()
+    client.force_authenticate(user=create_user)
+    url = f'/api/v1/chat/chatrooms/{create_chatroom.id}/members/'
+    cursor = base64.urlsafe_b64encode(values).decode()
+
+    assert client.get(url, {'before': cursor}).status_code == 400
+    assert client.get(url, {'after': cursor}).status_code == 400
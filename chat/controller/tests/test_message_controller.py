@@ -67,10 +67,12 @@
 #     assert response.data['file'] == save_attachment(attachment_data, messages[0]).file.url
 
 
+import base64
+
 import pytest
 from rest_framework.test import APIClient
 from user.models import User
-from chat.entity.chat_models import ChatRoom, Message
+from chat.entity.chat_models import Attachment, ChatRoom, Message, OutboxEvent
 from chat.service.message_service import list_messages
 
 @pytest.fixture
@@ -141,3 +143,94 @@ def test_send_message_view_chatroom_not_found(api_client, user):
     assert response.status_code == 404
     assert 'error' in response.data
 
+
+
+@pytest.mark.django_db
+def test_send_message_view_records_outbox_event(api_client, user, chatroom):
+    api_client.force_authenticate(user=user)
+    url = f'/api/v1/chat/chatrooms/{chatroom.id}/messages/send/'
+
+    response = api_client.post(url, {'content': 'Test message'})
+
+    assert response.status_code == 201
+    event = OutboxEvent.objects.get()
+    assert event.payload['purpose'] == 'new_chat_message'
+    assert event.payload['chat_id'] == chatroom.id
+    assert event.payload['message'] == 'Test message'
+    assert event.payload['sender'] == user.username
+
+
+@pytest.mark.django_db
+def test_send_message_view_rejects_non_members(api_client, chatroom):
+    outsider = User.objects.create_user(email='outsider@test.com', username='outsider')
+    api_client.force_authenticate(user=outsider)
+    url = f'/api/v1/chat/chatrooms/{chatroom.id}/messages/send/'
+
+    response = api_client.post(url, {'content': 'Test message'})
+
+    assert response.status_code == 403
+    assert not Message.objects.exists()
+
+
+@pytest.mark.django_db
+def test_send_message_view_sees_a_fresh_join(api_client, chatroom):
+    newcomer = User.objects.create_user(email='newcomer@test.com', username='newcomer')
+    api_client.force_authenticate(user=newcomer)
+    url = f'/api/v1/chat/chatrooms/{chatroom.id}/messages/send/'
+    assert api_client.post(url, {'content': 'Too early'}).status_code == 403
+
+    api_client.post(f'/api/v1/chat/chatrooms/{chatroom.id}/enter/')
+    response = api_client.post(url, {'content': 'Test message'})
+
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_message_list_view_pages_through_history(api_client, user, chatroom):
+    api_client.force_authenticate(user=user)
+    url = f'/api/v1/chat/chatrooms/{chatroom.id}/messages/'
+    contents = [f'Message {i}' for i in range(5)]
+    for content in contents:
+        Message.objects.create(content=content, sender=user, chatroom=chatroom)
+
+    response = api_client.get(url, {'limit': 2})
+    assert [m['content'] for m in response.data['detail']] == contents[3:]
+    assert response.data['cursors']['after'] is None
+
+    seen = []
+    while response.data['cursors']['before']:
+        seen[:0] = [m['content'] for m in response.data['detail']]
+        response = api_client.get(url, {'limit': 2, 'before': response.data['cursors']['before']})
+    seen[:0] = [m['content'] for m in response.data['detail']]
+    assert seen == contents
+
+    response = api_client.get(url, {'limit': 3, 'after': response.data['cursors']['after']})
+    assert [m['content'] for m in response.data['detail']] == contents[1:4]
+
+
+@pytest.mark.django_db
+def test_message_list_view_rejects_bad_cursor(api_client, user, chatroom):
+    api_client.force_authenticate(user=user)
+    url = f'/api/v1/chat/chatrooms/{chatroom.id}/messages/'
+
+    assert api_client.get(url, {'before': 'nope'}).status_code == 400
+    for values in (b'["x", 1]', b'[{}, 1]', b'[[1], 1]', b'["2020-01-01T00:00:00", {"a": 1}]',
+                   b'["2020-01-01T00:00:00", 1.5]', b'["2020-01-01T00:00:00", true]'):
+        cursor = base64.urlsafe_b64encode(values).decode()
+        assert api_client.get(url, {'before': cursor}).status_code == 400, values
+        assert api_client.get(url, {'after': cursor}).status_code == 400, values
+
+
+@pytest.mark.django_db
+def test_message_list_view_prefetches_attachments(api_client, user, chatroom, django_assert_num_queries):
+    api_client.force_authenticate(user=user)
+    for i in range(5):
+        message = Message.objects.create(content=f'Message {i}', sender=user, chatroom=chatroom)
+        Attachment.objects.create(message=message, file=f'root/image/{i}.png')
+
+    with django_assert_num_queries(2):
+        response = api_client.get(f'/api/v1/chat/chatrooms/{chatroom.id}/messages/')
+
+    assert [m['attachment'] for m in response.data['detail']] == [
+        f'/media/root/image/{i}.png' for i in range(5)
+    ]
@@ -0,0 +1,31 @@
+import pytest
+from rest_framework.test import APIClient
+from user.models import User
+
+
+@pytest.mark.django_db
+def test_send_queue_stats_are_admin_only():
+    client = APIClient()
+    user = User.objects.create_user(email='test@test.com', username='testuser')
+    client.force_authenticate(user=user)
+    url = '/api/v1/chat/stats/send-queues/'
+
+    assert client.get(url).status_code == 403
+
+    user.is_staff = True
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert {'connections', 'queued_frames', 'dropped_frames'} <= set(response.data['detail'])
+
+
+@pytest.mark.django_db
+def test_connection_stats_report_live_and_reaped_sockets():
+    client = APIClient()
+    admin = User.objects.create_user(email='admin@test.com', username='admin', is_staff=True)
+    client.force_authenticate(user=admin)
+
+    response = client.get('/api/v1/chat/stats/connections/')
+
+    assert response.status_code == 200
+    assert set(response.data['detail']) == {'live_sockets', 'reaped_sockets'}
@@ -5,6 +5,7 @@ This module defines Django models for chat-related entities, including ChatRoom,
 """
 
 from django.db import models
+from django.utils import timezone
 from user.models import User
 from chat.mixins import TimeStampMixin
 
@@ -59,10 +60,15 @@ class ChatRoom(TimeStampMixin, models.Model):
         name (str): The name of the chat room.
         members (ManyToManyField): Users who are members of the chat room.
         admin (ForeignKey): The admin of the chat room.
+        last_message (ForeignKey): The latest message of the chat room,
+            kept up to date by MessageRepository.record_activity.
+        last_activity_at (DateTimeField): The timestamp of the latest
+            message, or of the creation of the chat room.
         created_at (DateTimeField): The timestamp of when the chat room was created.
 
     Meta:
         ordering: The default ordering for chat rooms based on creation time.
+        indexes: The chat rooms by latest activity, for the inbox.
 
     Methods:
         __str__: Returns a string representation of the chat room.
@@ -76,9 +82,22 @@ class ChatRoom(TimeStampMixin, models.Model):
         on_delete=models.CASCADE,
         null=True,
     )
+    last_message = models.ForeignKey(
+        "Message",
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    last_activity_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            models.Index(
+                fields=["last_activity_at", "id"], name="chat_room_activity_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - Admin: {self.admin.username}; Created: {self.created_at}"
@@ -93,12 +112,25 @@ class Message(TimeStampMixin, models.Model):
         chatroom (ForeignKey): The chat room to which the message belongs.
         content (TextField): The content of the message.
         created_at (DateTimeField): The timestamp of when the message was created.
+
+    Meta:
+        indexes: The history of a chatroom, paged on (created_at, id),
+        and the messages after an id, read when a socket resumes.
     """
 
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     chatroom = models.ForeignKey(ChatRoom, on_delete=models.CASCADE)
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["chatroom", "created_at", "id"],
+                name="chat_message_room_created_idx",
+            ),
+            models.Index(fields=["chatroom", "id"], name="chat_message_room_id_idx"),
+        ]
+
 class Attachment(TimeStampMixin, models.Model):
     """
     Model representing an attachment in a chat message.
@@ -107,6 +139,9 @@ class Attachment(TimeStampMixin, models.Model):
         message (ForeignKey): The message to which the attachment belongs.
         file (FileField): The file attachment.
         created_at (DateTimeField): The timestamp of when the attachment was created.
+
+    Meta:
+        indexes: The first attachment of a message, by id.
     """
 
     message = models.ForeignKey(
@@ -119,3 +154,27 @@ class Attachment(TimeStampMixin, models.Model):
     file = models.FileField(
         upload_to=attachment_location, max_length=455, null=True, blank=True
     )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["message", "id"], name="chat_attachment_message_idx"),
+        ]
+
+
+class OutboxEvent(TimeStampMixin, models.Model):
+    """
+    Model representing a chat event waiting to be published to RabbitMQ.
+
+    Events are written in the same database transaction as the change
+    they announce, and the outbox relay publishes and deletes them in
+    id order.
+
+    Attributes:
+        payload (JSONField): The event data to be published.
+        claimed_until (DateTimeField): Until when a relay publishing the
+            event has it to itself, or None if no relay claimed it.
+        created_at (DateTimeField): The timestamp of when the event was recorded.
+    """
+
+    payload = models.JSONField()
+    claimed_until = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,82 @@
+import asyncio
+from aio_pika import DeliveryMode, Message, connect
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chat.service.dead_letters import (
+    ORIGINAL_QUEUE_HEADER,
+    REASON_HEADER,
+    RETRY_COUNT_HEADER,
+    declare_dead_letter_queue,
+)
+
+
+class Command(BaseCommand):
+    help = 'Lists dead-lettered chat messages, or replays or discards them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of dead-lettered messages to handle.',
+        )
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            '--replay', action='store_true',
+            help='Send the messages back to the queue they failed on.',
+        )
+        action.add_argument(
+            '--discard', action='store_true',
+            help='Remove the messages from the dead-letter queue.',
+        )
+
+    async def handle_async(self, *args, **options):
+        connection = await connect(settings.RABBITMQ_URL)
+        async with connection:
+            channel = await connection.channel()
+            _, queue = await declare_dead_letter_queue(channel)
+
+            # Hold every message unacked until the end, so listing does
+            # not fetch the same requeued message over and over.
+            messages = []
+            while len(messages) < options['limit']:
+                message = await queue.get(fail=False)
+                if message is None:
+                    break
+                messages.append(message)
+
+            for message in messages:
+                headers = dict(message.headers or {})
+                self.stdout.write(
+                    f"[{headers.get(ORIGINAL_QUEUE_HEADER)}] "
+                    f"{headers.get(REASON_HEADER)}: "
+                    f"{message.body.decode(errors='replace')}"
+                )
+                if options['replay']:
+                    original_queue = headers.get(ORIGINAL_QUEUE_HEADER)
+                    if not original_queue:
+                        await message.reject(requeue=True)
+                        continue
+                    # A replayed message gets a fresh set of retries
+                    headers.pop(RETRY_COUNT_HEADER, None)
+                    headers.pop(REASON_HEADER, None)
+                    await channel.default_exchange.publish(
+                        Message(
+                            message.body,
+                            headers=headers,
+                            content_type=message.content_type,
+                            delivery_mode=DeliveryMode.PERSISTENT,
+                        ),
+                        routing_key=original_queue,
+                    )
+                    await message.ack()
+                elif options['discard']:
+                    await message.ack()
+                else:
+                    await message.reject(requeue=True)
+
+            verb = 'Replayed' if options['replay'] else 'Discarded' if options['discard'] else 'Listed'
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} {len(messages)} dead-lettered message(s)'
+                ))
+
+    def handle(self, *args, **options):
+        asyncio.run(self.handle_async(*args, **options))
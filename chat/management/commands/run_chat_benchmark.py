@@ -0,0 +1,20 @@
+import asyncio
+from importlib import import_module
+from django.core.management.base import BaseCommand
+from chat.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Runs a chat pipeline micro-benchmark'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name, module_path in BENCHMARKS.items():
+            module = import_module(module_path)
+            module.add_arguments(subparsers.add_parser(name))
+
+    def handle(self, *args, **options):
+        module = import_module(BENCHMARKS[options['benchmark']])
+        results = asyncio.run(module.run(options))
+        for key, value in results.items():
+            self.stdout.write(f'{key}: {value}')
@@ -1,16 +1,116 @@
 import asyncio
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from chat.service import topology
 from chat.service.subscriber import main
+from chat.service.supervisor import SubscriberSupervisor
+
+
+def parse_id_ranges(value):
+    """
+    Parse a comma separated list of ids and inclusive ranges, e.g. "1,4-7".
+
+    Args:
+        value (str): The ids to parse.
+
+    Returns:
+        list: The parsed ids.
+    """
+    ids = []
+    try:
+        for part in value.split(','):
+            start, _, end = part.partition('-')
+            ids.extend(range(int(start), int(end or start) + 1))
+    except ValueError:
+        raise CommandError(f'Invalid id list: {value}')
+    return ids
+
 
 class Command(BaseCommand):
     help = 'Starts the whatsapp chat subsriber service'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            help='Queue to consume. Subscribers serving different rooms need different queues.',
+        )
+        parser.add_argument(
+            '--rooms',
+            type=parse_id_ranges,
+            help='Only receive events of these chatrooms, e.g. "1,4-7" (topic exchange only).',
+        )
+        parser.add_argument(
+            '--buckets',
+            type=parse_id_ranges,
+            help='Only receive events of these routing buckets, e.g. "0-63" (topic exchange only).',
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            help='Total number of subscriber shards chatrooms are hashed onto (topic exchange only).',
+        )
+        parser.add_argument(
+            '--shard-id',
+            type=int,
+            help='The shard consumed by this subscriber, between 0 and --shards - 1.',
+        )
+        parser.add_argument(
+            '--shard-generation',
+            type=int,
+            default=0,
+            help='Generation of --shards; raise it with every change of --shards so running shards adopt the new count.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Fork this many subscriber processes, splitting the shards between them (topic exchange only).',
+        )
+
     async def handle_async(self, *args, **options):
+        shards, shard_id = options['shards'], options['shard_id']
+        if shards is not None:
+            if shard_id is None or not 0 <= shard_id < shards:
+                raise CommandError('--shard-id must be between 0 and --shards - 1')
+            if not topology.is_routed():
+                raise CommandError("Sharding requires CHAT_EXCHANGE_TYPE = 'topic'")
+
         self.stdout.write(self.style.SUCCESS(
             'Starting websocket subscriber service...'
             ))
 
-        await main()
+        await main(
+            queue_name=options['queue'],
+            chat_ids=options['rooms'],
+            buckets=options['buckets'],
+            shards=shards,
+            shard_ids=[shard_id] if shards is not None else None,
+            shard_generation=options['shard_generation'],
+        )
+
+    def handle_workers(self, workers, shards, shard_generation):
+        if not topology.is_routed():
+            raise CommandError("--workers requires CHAT_EXCHANGE_TYPE = 'topic'")
+        # Each worker consumes its own shards, so rooms stay ordered
+        shards = shards or workers
+        if shards < workers:
+            raise CommandError('--shards must be at least --workers')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Starting {workers} websocket subscriber workers...'
+            ))
+        SubscriberSupervisor([
+            {
+                'shards': shards,
+                'shard_ids': list(range(index, shards, workers)),
+                'shard_generation': shard_generation,
+            }
+            for index in range(workers)
+        ]).run()
 
     def handle(self, *args, **options):
+        if options['workers']:
+            if options['shard_id'] is not None:
+                raise CommandError('--shard-id cannot be combined with --workers')
+            return self.handle_workers(
+                options['workers'], options['shards'], options['shard_generation']
+            )
         asyncio.run(self.handle_async(*args, **options))
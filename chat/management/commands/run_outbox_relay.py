@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from chat.service.outbox_relay import run_relay
+
+class Command(BaseCommand):
+    help = 'Starts the chat outbox relay, publishing recorded chat events to RabbitMQ'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            'Starting outbox relay service...'
+            ))
+
+        run_relay()
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:51
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently so the tables stay writable
+    # while they are created, which cannot happen in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('chat', '0007_outboxevent'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='attachment',
+            index=models.Index(fields=['message', 'id'], name='chat_attachment_message_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(fields=['chatroom', 'created_at', 'id'], name='chat_message_room_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(fields=['chatroom', 'id'], name='chat_message_room_id_idx'),
+        ),
+        # The chatrooms of a user, read from the auto-created through
+        # table of ChatRoom.members, which has no Meta to declare it on.
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS chat_chatroom_members_user_idx '
+            'ON chat_chatroom_members (user_id, chatroom_id)',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS chat_chatroom_members_user_idx',
+        ),
+    ]
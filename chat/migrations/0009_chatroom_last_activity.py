@@ -0,0 +1,43 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_chat_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.message'),
+        ),
+        # Point every chatroom at its latest message, or date its
+        # activity from its creation when it has none.
+        migrations.RunSQL(
+            """
+            UPDATE chat_chatroom AS room
+            SET last_message_id = latest.id, last_activity_at = latest.created_at
+            FROM (
+                SELECT DISTINCT ON (chatroom_id) chatroom_id, id, created_at
+                FROM chat_message
+                ORDER BY chatroom_id, created_at DESC, id DESC
+            ) AS latest
+            WHERE latest.chatroom_id = room.id AND latest.created_at IS NOT NULL;
+            UPDATE chat_chatroom
+            SET last_activity_at = created_at
+            WHERE last_message_id IS NULL AND created_at IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.6 on 2026-10-18 09:12
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Built concurrently like the indexes of 0008, so the chatrooms stay
+    # writable while the index is created.
+    atomic = False
+
+    dependencies = [
+        ('chat', '0009_chatroom_last_activity'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='chatroom',
+            index=models.Index(fields=['last_activity_at', 'id'], name='chat_room_activity_idx'),
+        ),
+    ]
@@ -1 +1 @@
-from .entity.chat_models import ChatRoom, Message
\ No newline at end of file
+from .entity.chat_models import ChatRoom, Message, OutboxEvent
\ No newline at end of file
@@ -5,7 +5,29 @@ This module provides repository methods for
 sql interactions with ChatRoom models.
 """
 
+from django.db.models import Prefetch
+
 from chat.models import ChatRoom
+from chat.repository.membership import MembershipRepository
+from chat.utils.pagination import paginate
+from user.models import User
+
+# Members a chatroom can hold
+MAX_CHATROOM_MEMBERS = 1024
+
+# Ordering key of the inbox, made unique by the id
+INBOX_KEYS = ("last_activity_at", "id")
+
+
+def member_prefetch():
+    """
+    Prefetch the members of chatrooms, with only the fields
+    ChatRoomSerializer reads.
+
+    Returns:
+        Prefetch: The prefetch of ``ChatRoom.members``.
+    """
+    return Prefetch("members", queryset=User.objects.only("id", "username"))
 
 
 class ChatRoomRepository:
@@ -35,21 +57,64 @@ class ChatRoomRepository:
         return chatroom
 
     @staticmethod
-    def fetch_chatrooms(user):
+    def fetch_chatrooms(user, with_members=True):
         """
         Fetch all chatrooms that the user is a member of.
 
+        Every chatroom is annotated with its ``member_count`` and comes
+        with its latest message and that message's sender. With
+        ``with_members``, the id and username of the members of every
+        chatroom are prefetched with one extra query.
+
         Args:
             user: The user whose chatrooms are to be fetched.
+            with_members: Whether to prefetch the members.
 
         Returns:
             QuerySet: QuerySet of chatrooms that the user is a member of.
         """
         try:
-            return ChatRoom.objects.filter(members=user)
+            chatrooms = (
+                ChatRoom.objects.filter(members=user)
+                .select_related("last_message__sender")
+                .annotate(member_count=MembershipRepository.count_subquery())
+            )
+            if with_members:
+                chatrooms = chatrooms.prefetch_related(member_prefetch())
+            return chatrooms
         except ChatRoom.DoesNotExist:
             return None
 
+    @staticmethod
+    def get_inbox(user, limit, before=None, after=None, with_members=True):
+        """
+        Retrieve a page of the chatrooms of a user, most recently active
+        first.
+
+        The page is read with a keyset condition on (last_activity_at,
+        id), kept up to date by MessageRepository.record_activity, so no
+        chatroom's messages are scanned to order it.
+
+        Args:
+            user: The user whose chatrooms are to be fetched.
+            limit: The maximum number of chatrooms to retrieve.
+            before: Cursor of the chatroom the page ends before, i.e.
+                of less recent chatrooms.
+            after: Cursor of the chatroom the page starts after, i.e.
+                of more recent chatrooms.
+            with_members: Whether to prefetch the members.
+
+        Returns:
+            KeysetPage: The chatrooms and the cursors of the less and
+            more recently active pages.
+
+        Raises:
+            ValueError: If a cursor is malformed.
+        """
+        chatrooms = ChatRoomRepository.fetch_chatrooms(user, with_members)
+        page = paginate(chatrooms, INBOX_KEYS, limit, before=before, after=after)
+        return page._replace(items=page.items[::-1])
+
     @staticmethod
     def exit_chatroom(user, chatroom):
         """
@@ -64,13 +129,12 @@ class ChatRoomRepository:
             or None if the user is not a member.
         """
         get_chatroom = ChatRoom.objects.filter(id=chatroom).first()
-        if get_chatroom is not None and user in get_chatroom.members.all():
-            get_chatroom.members.remove(user)
-            return get_chatroom
-        elif not get_chatroom is not None:
-            return None
-        else:
+        if get_chatroom is None or not MembershipRepository.exists(
+            get_chatroom.id, user.id
+        ):
             return None
+        get_chatroom.members.remove(user)
+        return get_chatroom
 
     @staticmethod
     def join_chatroom(user, chatroom):
@@ -85,12 +149,12 @@ class ChatRoomRepository:
             ChatRoom or str: The chatroom after the user has joined,
             or "chatroom filled" if the chatroom is full.
         """
-        if ChatRoom.objects.filter(id=chatroom).count() >= 1024:
-            return "chatroom filled"
         get_chatroom = ChatRoom.objects.filter(id=chatroom).first()
-        if get_chatroom is not None and user in get_chatroom.members.all():
-            return None
-        elif not get_chatroom is not None:
+        if get_chatroom is None or MembershipRepository.exists(
+            get_chatroom.id, user.id
+        ):
             return None
+        if MembershipRepository.count(get_chatroom.id) >= MAX_CHATROOM_MEMBERS:
+            return "chatroom filled"
         get_chatroom.members.add(user)
         return get_chatroom
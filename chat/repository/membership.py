@@ -0,0 +1,117 @@
+"""
+repositories.py
+
+This module provides repository methods for
+sql interactions with chatroom memberships.
+"""
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from chat.entity.chat_models import ChatRoom
+from chat.utils.pagination import paginate
+
+# The through table of ChatRoom.members, one row per (chatroom, user)
+Membership = ChatRoom.members.through
+
+# Ordering key of member pages, read from the (chatroom_id, user_id) index
+MEMBER_KEYS = ("user_id",)
+
+
+class MembershipRepository:
+    @staticmethod
+    def exists(chatroom_id, user_id):
+        """
+        Check whether a user is a member of a chatroom.
+
+        Uses the unique (chatroom_id, user_id) index of the through table.
+
+        Args:
+            chatroom_id: The ID of the chatroom.
+            user_id: The ID of the user.
+
+        Returns:
+            bool: True if the user is a member.
+        """
+        return Membership.objects.filter(
+            chatroom_id=chatroom_id, user_id=user_id
+        ).exists()
+
+    @staticmethod
+    def count(chatroom_id):
+        """
+        Count the members of a chatroom.
+
+        Args:
+            chatroom_id: The ID of the chatroom.
+
+        Returns:
+            int: The number of members.
+        """
+        return Membership.objects.filter(chatroom_id=chatroom_id).count()
+
+    @staticmethod
+    def chatroom_ids(user_id):
+        """
+        List the chatrooms a user is a member of.
+
+        Reads the through table alone, from its (user_id, chatroom_id)
+        index.
+
+        Args:
+            user_id: The ID of the user.
+
+        Returns:
+            list: The IDs of the chatrooms.
+        """
+        return list(
+            Membership.objects.filter(user_id=user_id).values_list(
+                "chatroom_id", flat=True
+            )
+        )
+
+    @staticmethod
+    def count_subquery():
+        """
+        Count the members of each chatroom of a queryset in SQL.
+
+        Unlike ``Count("members")``, the count is not narrowed by a
+        filter on the members, such as the one listing a user's
+        chatrooms.
+
+        Returns:
+            Coalesce: The expression to annotate chatrooms with.
+        """
+        counts = (
+            Membership.objects.filter(chatroom_id=OuterRef("pk"))
+            .order_by()
+            .values("chatroom_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    @staticmethod
+    def get_members(chatroom_id, limit, before=None, after=None):
+        """
+        Retrieve a page of the members of a chatroom, by user id.
+
+        Args:
+            chatroom_id: The ID of the chatroom.
+            limit: The maximum number of members to retrieve.
+            before: Cursor of the member the page ends before.
+            after: Cursor of the member the page starts after.
+
+        Returns:
+            KeysetPage: Dicts with the ``user_id`` and ``user__username``
+            of each member, and the cursors of the pages around them.
+
+        Raises:
+            ValueError: If a cursor is malformed.
+        """
+        members = Membership.objects.filter(chatroom_id=chatroom_id).values(
+            "user_id", "user__username"
+        )
+        return paginate(
+            members, MEMBER_KEYS, limit, before=before, after=after, first=True
+        )
@@ -5,7 +5,15 @@ This module provides repository methods for
 sql interactions with Message and Attachment models.
 """
 
+from django.db import transaction
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
 from chat.entity.chat_models import Attachment, Message, ChatRoom
+from chat.utils.pagination import paginate
+
+# Ordering key of the message history, made unique by the id
+MESSAGE_KEYS = ("created_at", "id")
 
 class MessageRepository:
     @staticmethod
@@ -22,25 +30,213 @@ class MessageRepository:
             Message: The created message.
         """
         message = Message(content=content, sender=sender, chatroom=chatroom)
-        message.save()
+        return MessageRepository.save_message(message)
+
+    @staticmethod
+    def save_message(message):
+        """
+        Insert an unsaved message and record it as the latest activity
+        of its chatroom, in one transaction.
+
+        Args:
+            message: The unsaved Message instance.
+
+        Returns:
+            Message: The saved message.
+        """
+        with transaction.atomic():
+            message.save()
+            MessageRepository.record_activity([message])
         return message
 
     @staticmethod
-    def get_messages(chatroom):
+    def bulk_create_messages(messages):
+        """
+        Insert several unsaved messages with a single query, and record
+        the latest of each chatroom as its latest activity, in one
+        transaction.
+
+        Args:
+            messages: The unsaved Message instances.
+
+        Returns:
+            list: The created messages.
+        """
+        with transaction.atomic():
+            created = Message.objects.bulk_create(messages)
+            MessageRepository.record_activity(created)
+        return created
+
+    @staticmethod
+    def record_activity(messages):
+        """
+        Point the chatrooms of saved messages at their latest message.
+
+        A chatroom already pointing at a later message is left alone, so
+        concurrent writers cannot move its activity back in time.
+        Chatrooms are updated in id order to keep the row locks of
+        concurrent batches from deadlocking.
+
+        Args:
+            messages: The saved Message instances.
+
+        Returns:
+            None
+        """
+        latest = {}
+        for message in messages:
+            current = latest.get(message.chatroom_id)
+            if current is None or (message.created_at, message.id) > (
+                current.created_at,
+                current.id,
+            ):
+                latest[message.chatroom_id] = message
+
+        for chatroom_id in sorted(latest):
+            message = latest[chatroom_id]
+            ChatRoom.objects.filter(
+                id=chatroom_id, last_activity_at__lte=message.created_at
+            ).update(last_message=message, last_activity_at=message.created_at)
+
+    @staticmethod
+    def delete_messages(messages):
+        """
+        Delete messages, moving the activity of the chatrooms whose
+        latest message is deleted back to their latest message left.
+
+        Args:
+            messages: A queryset of the messages to delete.
+
+        Returns:
+            None
+        """
+        with transaction.atomic():
+            chatroom_ids = MessageRepository.chatrooms_led_by(messages)
+            messages.delete()
+            MessageRepository.rewind_activity(chatroom_ids)
+
+    @staticmethod
+    def chatrooms_led_by(messages):
+        """
+        Retrieve the chatrooms whose latest message is one of messages.
+
+        Args:
+            messages: A queryset of messages.
+
+        Returns:
+            list: The IDs of the chatrooms.
+        """
+        return list(
+            ChatRoom.objects.filter(last_message__in=messages).values_list(
+                "id", flat=True
+            )
+        )
+
+    @staticmethod
+    def rewind_activity(chatroom_ids):
+        """
+        Point chatrooms whose latest message was deleted at the latest
+        one left, or date their activity from their creation when none
+        is.
+
+        Deleting the latest message already cleared a chatroom's
+        last_message, so a chatroom pointing at a message again is left
+        alone, and so are chatrooms deleted as well. All the chatrooms
+        are updated in one query.
+
+        Args:
+            chatroom_ids: The IDs of the chatrooms.
+
+        Returns:
+            None
+        """
+        if not chatroom_ids:
+            return
+        latest = Message.objects.filter(chatroom_id=OuterRef("id")).order_by(
+            "-created_at", "-id"
+        )
+        ChatRoom.objects.filter(id__in=chatroom_ids, last_message__isnull=True).update(
+            last_message=Subquery(latest.values("id")[:1]),
+            last_activity_at=Coalesce(
+                Subquery(latest.values("created_at")[:1]), F("created_at")
+            ),
+        )
+
+    @staticmethod
+    def get_messages_after(chatroom_id, after_id, limit):
         """
-        Retrieve all messages in the specified chatroom.
+        Retrieve a page of the messages sent after a given message.
+
+        The page is read with a keyset condition on the message id, so
+        its cost depends on the page size, not on how many messages
+        came before.
+
+        Args:
+            chatroom_id: The ID of the chatroom.
+            after_id: The ID of the last message already seen.
+            limit: The maximum number of messages to retrieve.
+
+        Returns:
+            list: Dicts with the ``id``, ``content`` and
+            ``sender__username`` of each message, oldest first.
+        """
+        return list(
+            Message.objects.filter(chatroom_id=chatroom_id, id__gt=after_id)
+            .order_by("id")
+            .values("id", "content", "sender__username")[:limit]
+        )
+
+    @staticmethod
+    def count_exceeds(chatroom_id, after_id, limit):
+        """
+        Check whether more than ``limit`` messages were sent after a
+        given message, without counting all of them.
+
+        Args:
+            chatroom_id: The ID of the chatroom.
+            after_id: The ID of the last message already seen.
+            limit: The number of messages to compare with.
+
+        Returns:
+            bool: True if there are more than ``limit`` messages.
+        """
+        return (
+            Message.objects.filter(chatroom_id=chatroom_id, id__gt=after_id)
+            .order_by("id")[limit : limit + 1]
+            .exists()
+        )
+
+    @staticmethod
+    def get_messages(chatroom, limit, before=None, after=None):
+        """
+        Retrieve a page of the messages in the specified chatroom.
+
+        The page is read with a keyset condition on (created_at, id), so
+        its cost depends on the page size, not on how old the chatroom
+        is. Without a cursor the newest messages are retrieved, with
+        their attachments prefetched by one extra query.
 
         Args:
             chatroom: The chatroom from which to retrieve messages.
+            limit: The maximum number of messages to retrieve.
+            before: Cursor of the message the page ends before.
+            after: Cursor of the message the page starts after.
 
         Returns:
-            QuerySet: QuerySet of messages in the chatroom, 
-            ordered by creation time.
+            KeysetPage: The messages, ordered by creation time, and
+            the cursors of the pages around them.
+
+        Raises:
+            ValueError: If a cursor is malformed.
         """
-        messages = Message.objects.filter(chatroom=chatroom).order_by(
-            "created_at"
+        messages = Message.objects.filter(chatroom=chatroom).prefetch_related(
+            Prefetch(
+                "message_attachment", queryset=Attachment.objects.order_by("id")
+            )
+        )
+        return paginate(
+            messages, MESSAGE_KEYS, limit, before=before, after=after
         )
-        return list(messages)
 
 def save_attachment(attachment, message_id):
     """
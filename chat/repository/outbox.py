@@ -0,0 +1,86 @@
+"""
+repositories.py
+
+This module provides repository methods for
+sql interactions with the OutboxEvent model.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from chat.entity.chat_models import OutboxEvent
+
+
+class OutboxRepository:
+    @staticmethod
+    def add_event(payload):
+        """
+        Record an event to be published once the current transaction
+        commits.
+
+        Args:
+            payload (dict): The event data to be published.
+
+        Returns:
+            OutboxEvent: The recorded event.
+        """
+        return OutboxEvent.objects.create(payload=payload)
+
+    @staticmethod
+    def claim_batch(limit, lease):
+        """
+        Claim the oldest unclaimed events for a while.
+
+        The claim is committed right away, so no row lock is held while
+        the events are published. Rows being claimed by another relay
+        are skipped rather than waited for, and a claim that was not
+        released by the end of its lease, e.g. because its relay died,
+        lapses.
+
+        Args:
+            limit: The maximum number of events to claim.
+            lease (float): Seconds the events are claimed for.
+
+        Returns:
+            list: The claimed events, ordered by id.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+                .order_by("id")[:limit]
+            )
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                claimed_until=now + timedelta(seconds=lease)
+            )
+        return events
+
+    @staticmethod
+    def release_events(event_ids):
+        """
+        Give up the claim of events that were not published.
+
+        Args:
+            event_ids: IDs of the events to release.
+
+        Returns:
+            None
+        """
+        OutboxEvent.objects.filter(id__in=event_ids).update(claimed_until=None)
+
+    @staticmethod
+    def delete_events(event_ids):
+        """
+        Delete published events.
+
+        Args:
+            event_ids: IDs of the events to delete.
+
+        Returns:
+            None
+        """
+        OutboxEvent.objects.filter(id__in=event_ids).delete()
@@ -0,0 +1,81 @@
+import pytest
+from datetime import timedelta
+from chat.entity.chat_models import ChatRoom, Message
+from chat.repository.message import MessageRepository
+from user.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(email='test@test.com', username='testuser')
+
+
+@pytest.mark.django_db
+def test_saved_messages_become_the_chatroom_activity(user):
+    first, second = ChatRoom.objects.create(name='First'), ChatRoom.objects.create(name='Second')
+
+    message = MessageRepository.create_message('hello', user, first)
+    created = MessageRepository.bulk_create_messages(
+        [Message(content=f'Message {i}', sender=user, chatroom=second) for i in range(3)]
+    )
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.last_message, first.last_activity_at) == (message, message.created_at)
+    assert (second.last_message, second.last_activity_at) == (created[-1], created[-1].created_at)
+
+
+@pytest.mark.django_db
+def test_an_older_message_does_not_move_the_activity_back(user):
+    chatroom = ChatRoom.objects.create(name='Room')
+    latest = MessageRepository.create_message('latest', user, chatroom)
+    older = Message.objects.create(content='older', sender=user, chatroom=chatroom)
+    older.created_at = latest.created_at - timedelta(seconds=1)
+
+    MessageRepository.record_activity([older])
+
+    chatroom.refresh_from_db()
+    assert chatroom.last_message == latest
+
+
+@pytest.mark.django_db
+def test_deleting_the_latest_message_rewinds_the_activity(user):
+    chatroom = ChatRoom.objects.create(name='Room')
+    first = MessageRepository.create_message('first', user, chatroom)
+    latest = MessageRepository.create_message('latest', user, chatroom)
+
+    MessageRepository.delete_messages(Message.objects.filter(id=first.id))
+    chatroom.refresh_from_db()
+    assert chatroom.last_message == latest
+
+    MessageRepository.delete_messages(Message.objects.filter(id=latest.id))
+    chatroom.refresh_from_db()
+    assert (chatroom.last_message, chatroom.last_activity_at) == (None, chatroom.created_at)
+
+
+@pytest.mark.django_db
+def test_deleting_a_user_rewinds_the_activity_of_their_chatrooms(user):
+    other = User.objects.create_user(email='other@test.com', username='other')
+    chatroom = ChatRoom.objects.create(name='Room')
+    previous = MessageRepository.create_message('previous', other, chatroom)
+    MessageRepository.create_message('latest', user, chatroom)
+
+    user.delete()
+
+    chatroom.refresh_from_db()
+    assert (chatroom.last_message, chatroom.last_activity_at) == (previous, previous.created_at)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('messages', [1, 100])
+def test_deleting_a_chatroom_takes_the_same_queries_for_any_messages(user, messages, django_assert_num_queries):
+    chatroom = ChatRoom.objects.create(name='Room')
+    MessageRepository.bulk_create_messages(
+        [Message(content=f'Message {i}', sender=user, chatroom=chatroom) for i in range(messages)]
+    )
+
+    # The messages are deleted in one batch per 100, not one at a time
+    with django_assert_num_queries(8):
+        chatroom.delete()
+
+    assert not Message.objects.exists()
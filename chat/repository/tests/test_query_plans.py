@@ -0,0 +1,125 @@
+import re
+
+import pytest
+from datetime import datetime, timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from chat.entity.chat_models import ChatRoom, Message, OutboxEvent
+from chat.repository.chat import ChatRoomRepository
+from chat.repository.membership import Membership, MembershipRepository
+from chat.repository.message import MessageRepository
+from chat.repository.outbox import OutboxRepository
+from chat.utils.pagination import encode_cursor
+from user.models import User
+
+USERS = 1000
+ROOMS = 2000
+MEMBERS_PER_ROOM = 10
+MESSAGES = 50000
+BUSY_ROOMS = 20  # rooms holding all but QUIET_MESSAGES of the messages
+QUIET_MESSAGES = 2  # in each of the other rooms
+
+
+@pytest.fixture(scope='module')
+def seeded(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        users = User.objects.bulk_create(
+            User(email=f'user{i}@test.com', username=f'user{i}') for i in range(USERS)
+        )
+        rooms = ChatRoom.objects.bulk_create(ChatRoom(name=f'Room {i}') for i in range(ROOMS))
+        Membership.objects.bulk_create(
+            Membership(chatroom_id=room.id, user_id=users[(i + j * 97) % USERS].id)
+            for i, room in enumerate(rooms)
+            for j in range(MEMBERS_PER_ROOM)
+        )
+        Message.objects.bulk_create(
+            Message(content=f'Message {i}', sender=users[i % USERS], chatroom=rooms[i % BUSY_ROOMS])
+            for i in range(MESSAGES)
+        )
+        Message.objects.bulk_create(
+            Message(content=f'Quiet {i}', sender=users[i % USERS], chatroom=room)
+            for room in rooms[BUSY_ROOMS:]
+            for i in range(QUIET_MESSAGES)
+        )
+        OutboxEvent.objects.bulk_create(OutboxEvent(payload={'i': i}) for i in range(MESSAGES // 10))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        yield users, rooms
+
+        tables = [model._meta.db_table for model in (Message, Membership, ChatRoom, OutboxEvent, User)]
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
+
+
+def history(rooms, user):
+    room = rooms[0]
+    page = MessageRepository.get_messages(room, 50)
+    MessageRepository.get_messages(room, 50, before=page.before)
+    MessageRepository.get_messages(room, 50, after=encode_cursor((datetime(2000, 1, 1, tzinfo=timezone.utc), 0)))
+
+
+# The busy rooms[0] for the history, and the quiet rooms[-1] for reading
+# on from a message id: in a busy room the planner rightly walks the
+# primary key instead, as every few rows it reads are in the room.
+REPOSITORY_CALLS = {
+    'message history': history,
+    'messages after': lambda rooms, user: MessageRepository.get_messages_after(rooms[-1].id, 0, 100),
+    'messages after exceed': lambda rooms, user: MessageRepository.count_exceeds(rooms[-1].id, 0, 10),
+    'membership exists': lambda rooms, user: MembershipRepository.exists(rooms[0].id, user.id),
+    'membership count': lambda rooms, user: MembershipRepository.count(rooms[0].id),
+    'members page': lambda rooms, user: MembershipRepository.get_members(rooms[0].id, 5),
+    'user inbox': lambda rooms, user: ChatRoomRepository.get_inbox(user, 50),
+    'exit chatroom': lambda rooms, user: ChatRoomRepository.exit_chatroom(user, rooms[0].id),
+    'outbox batch': lambda rooms, user: OutboxRepository.claim_batch(100, 60),
+    'outbox delete': lambda rooms, user: OutboxRepository.delete_events([1, 2, 3]),
+}
+
+# The indexes each call must read through, any one of a set will do
+MEMBERS_ROOM_IDX = 'chat_chatroom_members_chatroom_id_05f3abe3'
+MEMBERS_USER_IDX = 'chat_chatroom_members_user_idx'
+MEMBERS_UNIQUE_IDX = 'chat_chatroom_members_chatroom_id_user_id_15fce157_uniq'
+EXPECTED_INDEXES = {
+    'message history': {'chat_message_room_created_idx'},
+    'messages after': {'chat_message_room_id_idx'},
+    # Probing a few rows, the room's foreign key index does as well
+    'messages after exceed': {'chat_message_room_id_idx', 'chat_message_chat_room_id_bee2301e'},
+    'membership exists': {MEMBERS_USER_IDX, MEMBERS_UNIQUE_IDX},
+    'membership count': {MEMBERS_ROOM_IDX, MEMBERS_UNIQUE_IDX},
+    'members page': {MEMBERS_ROOM_IDX, MEMBERS_UNIQUE_IDX},
+    'user inbox': {MEMBERS_USER_IDX},
+    'exit chatroom': {'chat_chatroom_pkey'},
+    'outbox batch': {'chat_outboxevent_pkey'},
+    'outbox delete': {'chat_outboxevent_pkey'},
+}
+
+# Calls whose rows must come out of the index already in order; the user
+# inbox is left out as it sorts the few chatrooms of the user, which the
+# planner rightly finds cheaper than walking the chatrooms by activity.
+INDEX_ORDERED = {'message history', 'messages after', 'outbox batch'}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', REPOSITORY_CALLS)
+def test_repository_queries_use_indexes(seeded, name):
+    users, rooms = seeded
+    with connection.cursor() as cursor:
+        # Small tables are cheaper to scan than to probe, so seq scans are
+        # priced out: one then only shows up when no index fits the query.
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    with CaptureQueriesContext(connection) as captured:
+        REPOSITORY_CALLS[name](rooms, users[-1])
+
+    assert captured.captured_queries
+    used = set()
+    for query in captured.captured_queries:
+        if query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT')):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {query['sql']}")
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        used.update(re.findall(r'Index (?:Only )?Scan (?:Backward )?(?:using|on) (\w+)', plan))
+        assert 'Seq Scan' not in plan, f"{query['sql']}\n{plan}"
+        if name in INDEX_ORDERED:
+            assert 'Sort' not in plan, f"{query['sql']}\n{plan}"
+    assert used & EXPECTED_INDEXES[name], f"{name} used {sorted(used)}"
@@ -0,0 +1,91 @@
+"""
+background_loop.py
+
+This module provides an asyncio event loop that runs forever in a
+daemon thread, so long-lived broker resources can be shared by every
+caller in the process regardless of which event loop (if any) the
+caller itself is running on.
+"""
+
+import asyncio
+import os
+import threading
+
+
+class BackgroundLoop:
+    """
+    An event loop running in its own daemon thread.
+
+    The loop is started lazily on first use and restarted after a fork,
+    since a loop thread never survives into a child process.
+
+    Methods:
+        submit: Schedule a coroutine and return a concurrent future.
+        run: Await a coroutine on the background loop from any loop.
+        run_sync: Run a coroutine from synchronous code and wait for it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """
+        Return the background loop, starting it if needed.
+
+        Returns:
+            asyncio.AbstractEventLoop: The running background loop.
+        """
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name=self.name, daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the background loop.
+
+        Args:
+            coro: The coroutine to run.
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro):
+        """
+        Await a coroutine on the background loop.
+
+        Args:
+            coro: The coroutine to run.
+
+        Returns:
+            Any: The coroutine's result.
+        """
+        loop = self.loop
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def run_sync(self, coro, timeout=None):
+        """
+        Run a coroutine on the background loop from synchronous code.
+
+        Args:
+            coro: The coroutine to run.
+            timeout (float): Seconds to wait for the result.
+
+        Returns:
+            Any: The coroutine's result.
+        """
+        return self.submit(coro).result(timeout)
@@ -0,0 +1,140 @@
+"""
+bus.py
+
+This module broadcasts cache invalidations to every process of every
+node over a RabbitMQ fanout exchange.
+
+Each process binds its own exclusive queue to the exchange, so an
+invalidation published by one process reaches all of them, including
+itself. Delivery is best effort: caches fed by the bus must expire on
+their own too, which bounds how stale a missed invalidation can leave
+them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+
+from aio_pika import ExchangeType, Message, connect_robust
+from django.conf import settings
+
+from chat.service.background_loop import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """
+    Process-wide publisher and consumer of invalidation messages.
+
+    The broker connection is opened on first use on a background event
+    loop, and reopened on the next use if it could not be opened.
+
+    Attributes:
+        url (str): The AMQP URL of the broker.
+        exchange_name (str): The fanout exchange invalidations go through.
+    """
+
+    def __init__(self, url=None, exchange_name=None):
+        self.url = url or settings.RABBITMQ_URL
+        self.exchange_name = (
+            exchange_name or f"{settings.CHAT_EXCHANGE_NAME}.invalidate"
+        )
+        self._background = BackgroundLoop(name="chat-invalidation-bus")
+        self._handlers = {}
+        self._exchange = None
+        self._started = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if (
+                self._started is None
+                or self._pid != os.getpid()
+                or (self._started.done() and self._started.exception())
+            ):
+                self._pid = os.getpid()
+                self._started = self._background.submit(self._start())
+            return self._started
+
+    async def _start(self):
+        connection = await connect_robust(self.url)
+        channel = await connection.channel()
+        self._exchange = await channel.declare_exchange(
+            self.exchange_name, ExchangeType.FANOUT
+        )
+        queue = await channel.declare_queue(exclusive=True)
+        await queue.bind(self._exchange)
+        await queue.consume(self._on_message, no_ack=True)
+
+    async def _on_message(self, message):
+        try:
+            message_obj = json.loads(message.body)
+            handlers = self._handlers.get(message_obj["topic"], [])
+            for handler in handlers:
+                handler(message_obj["keys"])
+        except Exception:
+            logger.exception("Could not apply invalidation %r", message.body)
+
+    def subscribe(self, topic, handler):
+        """
+        Call a handler with the keys of every invalidation of a topic.
+
+        Args:
+            topic (str): The topic to follow.
+            handler: Function called with the list of invalidated keys,
+            on the bus's background thread.
+
+        Returns:
+            None
+        """
+        self._handlers.setdefault(topic, []).append(handler)
+        self._ensure_started()
+
+    def publish(self, topic, keys):
+        """
+        Broadcast an invalidation without waiting for it to be sent.
+
+        Args:
+            topic (str): The topic of the invalidated keys.
+            keys (list): The invalidated keys, JSON serializable.
+
+        Returns:
+            concurrent.futures.Future: Resolves once the broker has the
+            invalidation.
+        """
+        started = self._ensure_started()
+        body = json.dumps({"topic": topic, "keys": keys}).encode()
+        future = self._background.submit(self._publish(started, body))
+        future.add_done_callback(self._log_failure)
+        return future
+
+    async def _publish(self, started, body):
+        await asyncio.wrap_future(started)
+        await self._exchange.publish(Message(body), routing_key="")
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.warning("Invalidation not broadcast: %r", future.exception())
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """
+    Return the process-wide invalidation bus, creating it on first use.
+
+    Returns:
+        InvalidationBus: The shared bus.
+    """
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = InvalidationBus()
+    return _bus
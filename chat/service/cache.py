@@ -0,0 +1,118 @@
+"""
+cache.py
+
+This module provides a small thread-safe, in-process cache whose
+entries expire after a fixed time and whose least recently used entries
+are evicted once it is full.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU cache with a time to live per entry.
+
+    Attributes:
+        maxsize (int): Number of entries kept before the least recently
+            used one is evicted.
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Get the value cached for a key.
+
+        Args:
+            key: The key to look up.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache a value for a key.
+
+        Args:
+            key: The key to cache the value under.
+            value: The value to cache.
+            ttl (float): Seconds the entry stays valid, defaults to the
+            cache's ``ttl``.
+
+        Returns:
+            None
+        """
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop the entry of a key, if any.
+
+        Args:
+            key: The key to drop.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_if(self, predicate):
+        """
+        Drop every entry matching a predicate.
+
+        This walks the whole cache, so keep it for rare events.
+
+        Args:
+            predicate: Function called with each key and value, returning
+            True for the entries to drop.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for key in [
+                key
+                for key, (value, _) in self._entries.items()
+                if predicate(key, value)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Drop every entry.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
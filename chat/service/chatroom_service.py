@@ -2,7 +2,13 @@
 This module provide services related to chatrooms, including creating new chatrooms,
 listing existing chatrooms for a user, leaving a chatroom, and joining a chatroom.
 """
+from django.conf import settings
+from django.db import transaction
+from chat.entity.chat_models import ChatRoom
 from chat.repository.chat import ChatRoomRepository
+from chat.repository.membership import MembershipRepository
+from chat.service.events import record_chat_event
+from chat.service.membership import invalidate_membership, is_member
 
 
 def create_chatroom(request, name, members):
@@ -18,26 +24,86 @@ def create_chatroom(request, name, members):
         The created chatroom object.
     """
     user = request.user
-    return ChatRoomRepository.perform_create_chatroom(user, name, members)
+    with transaction.atomic():
+        chatroom = ChatRoomRepository.perform_create_chatroom(user, name, members)
+        member_ids = list(chatroom.members.values_list("id", flat=True))
+        invalidate_membership(chatroom.id, member_ids)
+        for member_id in member_ids:
+            record_member_added(chatroom.id, member_id)
+    return chatroom
 
 
-def list_chatrooms(user):
+def record_member_added(chatroom_id, user_id):
     """
-    List all chatrooms for a given user.
+    Tell a new member's inbox sockets to subscribe to the chatroom.
+
+    Args:
+        chatroom_id: The ID of the chatroom.
+        user_id: The ID of the new member.
+
+    Returns:
+        None
+    """
+    record_chat_event(
+        {"purpose": "member_added", "chat_id": chatroom_id, "user_id": user_id}
+    )
+
+
+def list_chatrooms(user, compact=False, limit=None, before=None, after=None):
+    """
+    List a page of the chatrooms of a given user, most recently active
+    first.
 
     Args:
         user: The user for whom to fetch chatrooms.
+        compact: Whether to leave out the members of the chatrooms.
+        limit: The page size, CHAT_INBOX_PAGE_SIZE by default.
+        before: Cursor of the chatroom the page ends before.
+        after: Cursor of the chatroom the page starts after.
 
     Returns:
-        List of chatroom objects.
+        KeysetPage: The chatroom objects and the cursors of the less and
+        more recently active pages.
     """
-    return ChatRoomRepository.fetch_chatrooms(user=user)
+    return ChatRoomRepository.get_inbox(
+        user,
+        limit or settings.CHAT_INBOX_PAGE_SIZE,
+        before=before,
+        after=after,
+        with_members=not compact,
+    )
+
+
+def list_members(chatroom, limit=None, before=None, after=None):
+    """
+    List a page of the members of a chatroom.
+
+    Args:
+        chatroom: The ID of the chatroom.
+        limit: The page size, CHAT_MEMBER_PAGE_SIZE by default.
+        before: Cursor of the member the page ends before.
+        after: Cursor of the member the page starts after.
+
+    Returns:
+        KeysetPage: The members, by user id, and the cursors of the
+        previous and next pages.
+    """
+    return MembershipRepository.get_members(
+        chatroom,
+        limit or settings.CHAT_MEMBER_PAGE_SIZE,
+        before=before,
+        after=after,
+    )
 
 
 def leave_chatroom(user, chatroom):
     """
     Leave a chatroom.
 
+    The chatroom is notified through events recorded in the same
+    transaction as the membership change (see events.py), which also
+    close the user's open WebSockets on the chatroom.
+
     Args:
         user: The user who is leaving the chatroom.
         chatroom: The chatroom to leave.
@@ -45,7 +111,29 @@ def leave_chatroom(user, chatroom):
     Returns:
         Response object indicating success or failure.
     """
-    return ChatRoomRepository.exit_chatroom(user, chatroom)
+    # The cached check spares non-members the chatroom lookup
+    if not is_member(chatroom, user.id):
+        return None
+    with transaction.atomic():
+        left_chatroom = ChatRoomRepository.exit_chatroom(user, chatroom)
+        if left_chatroom is not None:
+            invalidate_membership(left_chatroom.id, [user.id])
+            record_chat_event(
+                {
+                    "purpose": "new_chat_message",
+                    "chat_id": left_chatroom.id,
+                    "message": f"{user.username} has left the chatroom",
+                    "sender": "WhatsApp MessengerBot",
+                }
+            )
+            record_chat_event(
+                {
+                    "purpose": "member_removed",
+                    "chat_id": left_chatroom.id,
+                    "user_id": user.id,
+                }
+            )
+    return left_chatroom
 
 
 def enter_chatroom(user, chatroom):
@@ -59,4 +147,20 @@ def enter_chatroom(user, chatroom):
     Returns:
         Response object indicating success or failure.
     """
-    return ChatRoomRepository.join_chatroom(user, chatroom)
+    # The cached check spares members the chatroom lookup
+    if is_member(chatroom, user.id):
+        return None
+    with transaction.atomic():
+        joined_chatroom = ChatRoomRepository.join_chatroom(user, chatroom)
+        if isinstance(joined_chatroom, ChatRoom):
+            invalidate_membership(joined_chatroom.id, [user.id])
+            record_member_added(joined_chatroom.id, user.id)
+            record_chat_event(
+                {
+                    "purpose": "new_chat_message",
+                    "chat_id": joined_chatroom.id,
+                    "message": f"{user.username} just joined the Chatroom",
+                    "sender": "WhatsApp MessengerBot",
+                }
+            )
+    return joined_chatroom
@@ -1,30 +1,230 @@
 # chat/consumers.py
 
+import asyncio
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from asgiref.sync import async_to_sync
+from channels.exceptions import StopConsumer
+from django.conf import settings
 from chat.entity.chat_models import Message, ChatRoom
+from chat.repository.membership import MembershipRepository
+from chat.repository.message import MessageRepository
+from chat.service.frames import chat_event, encode_frame
+from chat.service.heartbeat import Heartbeat
+from chat.service.membership import is_member
+from chat.service.outbound import RESYNC_FRAME, OutboundQueue
+from chat.service.write_behind import get_message_buffer
 
+# Close code sent to a client whose send queue overflowed
+SLOW_CLIENT_CLOSE_CODE = 4008
+# Close code sent to a client that stopped answering pings
+IDLE_CLIENT_CLOSE_CODE = 4009
+
+PING_FRAME = encode_frame({"purpose": "ping"})
+
+
+class ConnectionState:
+    """
+    What a WebSocket connection needs to know about its chatroom and
+    user, resolved once when the socket connects.
+
+    Attributes:
+        chatroom_id (int): The ID of the chatroom.
+        user_id (int): The ID of the connected user.
+        username (str): The username of the connected user.
+        is_member (bool): Whether the user is a member of the chatroom.
+    """
+
+    __slots__ = ("chatroom_id", "user_id", "username", "is_member")
+
+    def __init__(self, chatroom_id, user_id, username, is_member):
+        self.chatroom_id = chatroom_id
+        self.user_id = user_id
+        self.username = username
+        self.is_member = is_member
+
+
+class QueuedWebsocketConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket consumer whose group events reach the client through a
+    bounded send queue (see outbound.py), and which is closed once the
+    client stops answering pings (see heartbeat.py).
+    """
+
+    outbound = None
+    heartbeat = None
+    torn_down = False
+
+    def open_outbound(self, query):
+        self.outbound = OutboundQueue(
+            self.send_text,
+            max_size=settings.CHAT_SEND_QUEUE_MAX_SIZE,
+            policy=settings.CHAT_SEND_QUEUE_POLICY,
+            on_overflow=self.close_slow_client,
+        )
+        if query.get("batch") == ["1"]:
+            # The client accepts arrays of events in one frame
+            self.outbound.batch_size = settings.CHAT_FRAME_BATCH_MAX_SIZE
+            self.outbound.batch_delay = settings.CHAT_FRAME_BATCH_MAX_DELAY_MS / 1000
+
+    def start_heartbeat(self):
+        # Off by default: clients that never answer a ping would be reaped
+        if not settings.CHAT_HEARTBEAT_INTERVAL:
+            return
+        self.heartbeat = Heartbeat(
+            self.send_ping,
+            self.reap,
+            interval=settings.CHAT_HEARTBEAT_INTERVAL,
+            timeout=settings.CHAT_HEARTBEAT_TIMEOUT,
+        )
+        self.heartbeat.start()
+
+    def send_ping(self):
+        self.outbound.put(PING_FRAME, ephemeral=False)
+
+    async def reap(self):
+        await self.close(code=IDLE_CLIENT_CLOSE_CODE)
+        # A half-open connection may never report the disconnect, so the
+        # groups are left now
+        await self.teardown(IDLE_CLIENT_CLOSE_CODE)
+
+    async def teardown(self, close_code):
+        # Reaping and the client's own disconnect may both get here, but
+        # the groups are only left once
+        if self.torn_down:
+            return
+        self.torn_down = True
+        await self.disconnect(close_code)
+
+    async def websocket_disconnect(self, message):
+        for group in self.groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.teardown(message["code"])
+        raise StopConsumer()
+
+    @staticmethod
+    def is_pong(text):
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            return False
+        return isinstance(frame, dict) and frame.get("purpose") == "pong"
+
+    async def websocket_receive(self, message):
+        if self.heartbeat is not None:
+            self.heartbeat.alive()
+        text = message.get("text")
+        if text and '"pong"' in text and self.is_pong(text):
+            return
+        await super().websocket_receive(message)
+
+    async def disconnect(self, close_code):
+        if self.heartbeat is not None:
+            self.heartbeat.stop()
+        if self.outbound is not None:
+            self.outbound.close()
+
+    async def chat_message(self, event):
+        # Forward a frame encoded once for the whole group as it is
+        frame = event.get("frame")
+        if frame is None:
+            frame = json.dumps({"data": event["data"]})
+        # Queue message for the WebSocket, chat messages may be dropped
+        # for a client that cannot keep up
+        self.outbound.put(frame, ephemeral=event["type"] == "chat.message")
+
+    async def send_text(self, frame):
+        await self.send(text_data=frame)
+
+    def close_slow_client(self):
+        asyncio.ensure_future(self.close(code=SLOW_CLIENT_CLOSE_CODE))
+
+    async def close_after_pending(self):
+        if self.outbound is not None:
+            await self.outbound.flush()
+        await self.close()
+
+
+class ChatConsumer(QueuedWebsocketConsumer):
+    state = None
+    replayed_ids = frozenset()
 
-class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.chatroom_id = self.scope["url_route"]["kwargs"]["chatroom_id"]
         self.chatroom_group_name = f"chat_{self.chatroom_id}"
         print("Room:", self.chatroom_group_name)
         print("User:", self.scope.get("user"))
+
+        self.state = await self.resolve_state(self.scope.get("user"))
+        if self.state is None or not self.state.is_member:
+            # reject a missing chatroom or a user who is not a member
+            await self.close()
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        self.open_outbound(query)
+
         # Join room group
         await self.channel_layer.group_add(
             self.chatroom_group_name, self.channel_name
         )
+        await self.accept()
+        self.start_heartbeat()
+
+        # Live events wait in the channel layer while missed messages
+        # are replayed, so nothing falls between the two.
+        last_seen_id = query.get("last_seen_id", [""])[0]
+        if last_seen_id.isdigit():
+            await self.replay_missed(int(last_seen_id))
 
-        await self.check_chatroom_user_membership_status(
-            self.chatroom_id, self.scope.get("user")
+    async def replay_missed(self, last_seen_id):
+        """
+        Send the messages sent after ``last_seen_id`` in keyset pages,
+        or ask the client for a full resync if it missed too many.
+
+        Args:
+            last_seen_id (int): The ID of the last message the client has.
+
+        Returns:
+            None
+        """
+        chatroom_id = self.state.chatroom_id
+        too_many = await database_sync_to_async(MessageRepository.count_exceeds)(
+            chatroom_id, last_seen_id, settings.CHAT_RESUME_MAX_MESSAGES
         )
-        # await self.check_if_user_is_a_chatroom_member
-        await self.accept()
+        if too_many:
+            self.outbound.put(RESYNC_FRAME, ephemeral=False)
+            return
+
+        replayed_ids = set()
+        after_id = last_seen_id
+        while True:
+            page = await database_sync_to_async(MessageRepository.get_messages_after)(
+                chatroom_id, after_id, settings.CHAT_RESUME_PAGE_SIZE
+            )
+            for row in page:
+                replayed_ids.add(row["id"])
+                self.outbound.put(
+                    encode_frame(
+                        {
+                            "purpose": "new_chat_message",
+                            "chat_id": chatroom_id,
+                            "message_id": row["id"],
+                            "message": row["content"],
+                            "sender": row["sender__username"],
+                            "durability": "persisted",
+                            "replayed": True,
+                        }
+                    )
+                )
+            if len(page) < settings.CHAT_RESUME_PAGE_SIZE:
+                break
+            after_id = page[-1]["id"]
+        self.replayed_ids = replayed_ids
 
     async def disconnect(self, close_code):
+        await super().disconnect(close_code)
         # Leave room group
         await self.channel_layer.group_discard(
             self.chatroom_group_name, self.channel_name
@@ -35,55 +235,172 @@ class ChatConsumer(AsyncWebsocketConsumer):
         print("text_data_json:", text_data_json)
         purpose = text_data_json["purpose"]
 
+        if self.state is None or not self.state.is_member:
+            return
+
         if purpose == "send_chat_message":
             message = text_data_json["message"]
-            sender = self.scope["user"]
 
-            # Save message to the database
-            await self.save_message(sender, message)
+            if settings.CHAT_MESSAGE_WRITE_BEHIND:
+                # Broadcast now, the buffer saves the message shortly
+                get_message_buffer().add(
+                    message, self.state.user_id, self.state.chatroom_id
+                )
+                # The id is only known once the buffer is flushed
+                message_id = None
+                durability = "buffered"
+            else:
+                # Save message to the database
+                message_id = await self.save_message(message)
+                durability = "persisted"
 
             data = {
                 "purpose": "new_chat_message",
+                "chat_id": self.state.chatroom_id,
+                "message_id": message_id,
                 "message": message,
-                "sender": sender.username,
+                "sender": self.state.username,
+                "durability": durability,
             }
 
             # Send message to room group
             await self.channel_layer.group_send(
-                self.chatroom_group_name,
-                {
-                    "type": "chat.message",
-                    "data": data,
-                },
+                self.chatroom_group_name, chat_event("chat.message", data)
             )
 
     async def chat_message(self, event):
-        print("EVEEEEENNNNNT:", event)
-        # Send message to WebSocket
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "data": event["data"],
-                }
+        if event["data"].get("message_id") in self.replayed_ids:
+            # Already sent while replaying missed messages
+            return
+        await super().chat_message(event)
+
+    async def chat_room_deleted(self, event):
+        self.state = None
+        await self.chat_message(event)
+        await self.close_after_pending()
+
+    async def chat_member_removed(self, event):
+        if self.state is None or event["data"]["user_id"] != self.state.user_id:
+            return
+        self.state.is_member = False
+        await self.chat_message(event)
+        await self.close_after_pending()
+
+    @database_sync_to_async
+    def save_message(self, message):
+        return MessageRepository.save_message(
+            Message(
+                content=message,
+                sender_id=self.state.user_id,
+                chatroom_id=self.state.chatroom_id,
             )
-        )
+        ).id
 
     @database_sync_to_async
-    def save_message(self, sender, message):
-        chatroom_id = int(self.chatroom_id)
-        chatroom = ChatRoom.objects.get(id=chatroom_id)
-        Message.objects.create(
-            content=message, sender=self.scope["user"], chatroom=chatroom
+    def resolve_state(self, user):
+        if user is None or not user.is_authenticated:
+            return None
+        if not str(self.chatroom_id).isdigit():
+            return None
+        chatroom = ChatRoom.objects.filter(id=int(self.chatroom_id)).first()
+        if chatroom is None:
+            return None
+        return ConnectionState(
+            chatroom.id, user.id, user.username, is_member(chatroom.id, user.id)
         )
 
-    @database_sync_to_async
-    def check_chatroom_user_membership_status(self, chatroom_id, user):
-        get_chatroom = ChatRoom.objects.filter(id=chatroom_id).first()
-        if get_chatroom is not None:
-            # check if a user is a Chatroom member
-            check_membership = ChatRoom.objects.filter(members=user).exists()
-            if check_membership:
-                pass
+
+class InboxConsumer(QueuedWebsocketConsumer):
+    """
+    One socket per user carrying the events of all of the user's
+    chatrooms, each tagged with its ``chat_id``.
+
+    The socket joins the group of every chatroom the user is a member of
+    when it connects, follows the user's joins through the ``user_<id>``
+    group and leaves a chatroom's group when the user is removed from it.
+    Clients may also subscribe and unsubscribe chatrooms in-band with
+    ``{"purpose": "subscribe", "chat_id": <id>}`` and
+    ``{"purpose": "unsubscribe", "chat_id": <id>}``.
+    """
+
+    user_id = None
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.user_id = user.id
+        self.user_group_name = f"user_{user.id}"
+        self.chat_ids = set()
+
+        self.open_outbound(parse_qs(self.scope.get("query_string", b"").decode()))
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        for chat_id in await self.fetch_chat_ids(user):
+            await self.subscribe(chat_id)
+        await self.accept()
+        self.start_heartbeat()
+        self.send_event({"purpose": "subscribed", "chat_ids": sorted(self.chat_ids)})
+
+    async def disconnect(self, close_code):
+        await super().disconnect(close_code)
+        if self.user_id is None:
+            return
+        await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+        for chat_id in list(self.chat_ids):
+            await self.unsubscribe(chat_id)
+
+    async def receive(self, text_data):
+        # Frames that are not JSON objects are ignored, the socket stays
+        try:
+            text_data_json = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(text_data_json, dict):
+            return
+        purpose = text_data_json.get("purpose")
+        try:
+            chat_id = int(text_data_json["chat_id"])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        if purpose == "subscribe":
+            if await database_sync_to_async(is_member)(chat_id, self.user_id):
+                await self.subscribe(chat_id)
+                self.send_event({"purpose": "subscribed", "chat_ids": [chat_id]})
             else:
-                # reject a user who is not a Chatroom member
-                async_to_sync(self.close)()
+                self.send_event({"purpose": "subscribe_denied", "chat_id": chat_id})
+        elif purpose == "unsubscribe":
+            await self.unsubscribe(chat_id)
+            self.send_event({"purpose": "unsubscribed", "chat_ids": [chat_id]})
+
+    def send_event(self, data):
+        self.outbound.put(encode_frame(data), ephemeral=False)
+
+    async def subscribe(self, chat_id):
+        self.chat_ids.add(chat_id)
+        await self.channel_layer.group_add(f"chat_{chat_id}", self.channel_name)
+
+    async def unsubscribe(self, chat_id):
+        self.chat_ids.discard(chat_id)
+        await self.channel_layer.group_discard(f"chat_{chat_id}", self.channel_name)
+
+    async def inbox_subscribe(self, event):
+        chat_id = event["data"]["chat_id"]
+        if chat_id not in self.chat_ids:
+            await self.subscribe(chat_id)
+            await self.chat_message(event)
+
+    async def chat_room_deleted(self, event):
+        await self.unsubscribe(event["data"]["chat_id"])
+        await self.chat_message(event)
+
+    async def chat_member_removed(self, event):
+        if event["data"]["user_id"] != self.user_id:
+            return
+        await self.unsubscribe(event["data"]["chat_id"])
+        await self.chat_message(event)
+
+    @database_sync_to_async
+    def fetch_chat_ids(self, user):
+        return MembershipRepository.chatroom_ids(user.id)
@@ -0,0 +1,165 @@
+"""
+dead_letters.py
+
+This module keeps failed subscriber deliveries from blocking the queue.
+
+A message whose delivery to the channel layer fails is moved to a retry
+queue and comes back to its original queue after an exponentially
+growing delay. After CHAT_SUBSCRIBER_MAX_RETRIES attempts, or straight
+away for a malformed message that can never be delivered, it is moved
+to the dead-letter queue, where ``chat_dead_letters`` can inspect and
+replay it.
+"""
+
+import logging
+
+from aio_pika import DeliveryMode, ExchangeType, Message
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_COUNT_HEADER = "x-retry-count"
+ORIGINAL_QUEUE_HEADER = "x-original-queue"
+ORIGINAL_ROUTING_KEY_HEADER = "x-original-routing-key"
+REASON_HEADER = "x-dead-letter-reason"
+
+
+def dead_letter_name():
+    """
+    Get the name of the dead-letter exchange and queue.
+
+    Returns:
+        str: The name.
+    """
+    return f"{settings.CHAT_EXCHANGE_NAME}.dead"
+
+
+def retry_delay_ms(attempt):
+    """
+    Get how long a message waits before its given retry attempt.
+
+    Args:
+        attempt (int): The retry attempt, starting at 1.
+
+    Returns:
+        int: The delay in milliseconds.
+    """
+    return settings.CHAT_SUBSCRIBER_RETRY_BASE_DELAY_MS * 2 ** (attempt - 1)
+
+
+async def declare_dead_letter_queue(channel):
+    """
+    Declare the dead-letter exchange and its queue.
+
+    Args:
+        channel: The channel to declare them on.
+
+    Returns:
+        tuple: The dead-letter exchange and queue.
+    """
+    exchange = await channel.declare_exchange(
+        dead_letter_name(), ExchangeType.FANOUT, durable=True
+    )
+    queue = await channel.declare_queue(dead_letter_name(), durable=True)
+    await queue.bind(exchange)
+    return exchange, queue
+
+
+class DeliveryFailures:
+    """
+    Retries or dead-letters the failed messages of one consumed queue.
+
+    Attributes:
+        channel: The channel used to publish retried and dead messages.
+        queue_name (str): The queue the failed messages came from.
+    """
+
+    def __init__(self, channel, queue_name):
+        self.channel = channel
+        self.queue_name = queue_name
+        self.dead_letter_exchange = None
+
+    def retry_queue_name(self, attempt):
+        return f"{self.queue_name}.retry.{attempt}"
+
+    async def declare(self):
+        """
+        Declare the retry queues of the queue and the dead-letter queue.
+
+        Each retry queue holds messages for its delay, then dead-letters
+        them back to the original queue through the default exchange.
+
+        Returns:
+            None
+        """
+        for attempt in range(1, settings.CHAT_SUBSCRIBER_MAX_RETRIES + 1):
+            await self.channel.declare_queue(
+                self.retry_queue_name(attempt),
+                durable=True,
+                arguments={
+                    "x-message-ttl": retry_delay_ms(attempt),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+        self.dead_letter_exchange, _ = await declare_dead_letter_queue(
+            self.channel
+        )
+
+    def _copy(self, message, headers):
+        original_headers = dict(message.headers or {})
+        original_headers.setdefault(ORIGINAL_QUEUE_HEADER, self.queue_name)
+        original_headers.setdefault(
+            ORIGINAL_ROUTING_KEY_HEADER, message.routing_key or ""
+        )
+        original_headers.update(headers)
+        return Message(
+            message.body,
+            headers=original_headers,
+            content_type=message.content_type,
+            delivery_mode=DeliveryMode.PERSISTENT,
+        )
+
+    async def retry(self, message, error):
+        """
+        Schedule another delivery attempt, or dead-letter the message
+        once it has no attempts left.
+
+        Args:
+            message: The incoming message that failed.
+            error (Exception): Why the delivery failed.
+
+        Returns:
+            None
+        """
+        attempt = int((message.headers or {}).get(RETRY_COUNT_HEADER, 0)) + 1
+        if attempt > settings.CHAT_SUBSCRIBER_MAX_RETRIES:
+            await self.dead_letter(message, f"retries exhausted: {error!r}")
+            return
+
+        logger.warning(
+            "Delivery failed (%r), retry %d in %d ms",
+            error,
+            attempt,
+            retry_delay_ms(attempt),
+        )
+        await self.channel.default_exchange.publish(
+            self._copy(message, {RETRY_COUNT_HEADER: attempt}),
+            routing_key=self.retry_queue_name(attempt),
+        )
+
+    async def dead_letter(self, message, reason):
+        """
+        Move a message to the dead-letter queue.
+
+        Args:
+            message: The incoming message that failed.
+            reason (str): Why the message cannot be delivered.
+
+        Returns:
+            None
+        """
+        logger.error("Dead-lettering message from %s: %s", self.queue_name, reason)
+        await self.dead_letter_exchange.publish(
+            self._copy(message, {REASON_HEADER: reason}), routing_key=""
+        )
@@ -0,0 +1,109 @@
+"""
+dispatcher.py
+
+This module provides a keyed worker pool for the event loop: items with
+different keys are handled concurrently while items sharing a key are
+handled one at a time, in the order they were submitted.
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedDispatcher:
+    """
+    Run a handler concurrently across keys and in FIFO order per key.
+
+    A worker task is started for a key when its first item arrives and
+    exits once the key's queue is empty, so idle keys cost nothing.
+
+    Attributes:
+        handler: Coroutine function called with each submitted item.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._queues = {}
+        self._workers = set()
+
+    @property
+    def pending(self):
+        """
+        Number of submitted items not handled yet.
+
+        Returns:
+            int: The number of queued and in-progress items.
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, key, item):
+        """
+        Queue an item behind the other items of its key.
+
+        Args:
+            key: The ordering key, e.g. a chatroom id.
+            item: The item passed to the handler.
+
+        Returns:
+            None
+        """
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(item)
+            return
+
+        self._queues[key] = deque([item])
+        worker = asyncio.ensure_future(self._work(key))
+        self._workers.add(worker)
+        worker.add_done_callback(self._workers.discard)
+
+    async def _work(self, key):
+        queue = self._queues[key]
+        try:
+            while queue:
+                if isinstance(queue[0], asyncio.Future):
+                    # A barrier of settle
+                    queue[0].set_result(None)
+                    queue.popleft()
+                    continue
+                try:
+                    await self.handler(queue[0])
+                except Exception:
+                    logger.exception("Handler failed for key %r", key)
+                # The item stays queued while it is handled, so items
+                # submitted meanwhile line up behind it.
+                queue.popleft()
+        finally:
+            del self._queues[key]
+
+    async def settle(self):
+        """
+        Wait until every item submitted so far has been handled.
+
+        Unlike join, items submitted meanwhile are not waited for, so
+        it returns even while items keep arriving.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        barriers = []
+        for queue in self._queues.values():
+            barrier = loop.create_future()
+            queue.append(barrier)
+            barriers.append(barrier)
+        if barriers:
+            await asyncio.wait(barriers)
+
+    async def join(self):
+        """
+        Wait until every submitted item has been handled.
+
+        Returns:
+            None
+        """
+        while self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
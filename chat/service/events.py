@@ -0,0 +1,75 @@
+"""
+events.py
+
+This module records chat events that must reach a chatroom's WebSocket
+consumers.
+
+Every event is written to the transactional outbox, from which the
+outbox relay publishes it to RabbitMQ for the subscriber and any
+non-Django consumers. With CHAT_DELIVERY_MODE = "direct" the event is
+also sent straight to the channel layer once the transaction commits,
+skipping the RabbitMQ -> subscriber -> channel layer double hop; the
+published copy is flagged so the subscriber does not deliver it again.
+"""
+
+import logging
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from chat.repository.outbox import OutboxRepository
+from chat.service.background_loop import BackgroundLoop
+from chat.service.publisher import publish_buffered
+from chat.service.subscriber import build_event
+
+logger = logging.getLogger(__name__)
+
+_direct_delivery = BackgroundLoop(name="chat-direct-delivery")
+
+
+def record_chat_event(payload):
+    """
+    Record a chat event inside the current transaction.
+
+    Args:
+        payload (dict): The event data, with the chatroom in ``chat_id``.
+
+    Returns:
+        None
+    """
+    if settings.CHAT_DELIVERY_MODE == "direct":
+        payload = {**payload, "direct": True}
+        transaction.on_commit(lambda: deliver_direct(payload))
+    OutboxRepository.add_event(payload)
+
+
+def deliver_direct(payload):
+    """
+    Queue an event for the channel layer without waiting for the send.
+
+    Args:
+        payload (dict): The event data.
+
+    Returns:
+        None
+    """
+    future = _direct_delivery.submit(_send(payload))
+    future.add_done_callback(lambda done: _fall_back_on_failure(done, payload))
+
+
+async def _send(payload):
+    event = build_event(payload)
+    if event is not None:
+        room_name, data = event
+        await get_channel_layer().group_send(room_name, data)
+
+
+def _fall_back_on_failure(future, payload):
+    error = future.exception()
+    if error is None:
+        return
+    logger.error("Direct delivery failed (%r), falling back to the broker", error)
+    # Without the flag the subscriber delivers the event as usual
+    fallback = {key: value for key, value in payload.items() if key != "direct"}
+    publish_buffered(fallback)
@@ -0,0 +1,52 @@
+"""
+frames.py
+
+This module builds the channel layer events sent to a chatroom's
+WebSocket consumers.
+
+With CHAT_PREENCODED_FRAMES enabled, each event also carries the text
+frame the consumers send, encoded once per group_send, so a room with N
+connected sockets does not serialise the same message N times. The
+frame is encoded with orjson when it is installed.
+"""
+
+import json
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def encode_frame(data):
+    """
+    Encode the text frame WebSocket consumers send for event data.
+
+    Args:
+        data (dict): The data of the event.
+
+    Returns:
+        str: The JSON text frame.
+    """
+    if orjson is not None:
+        return orjson.dumps({"data": data}).decode()
+    return json.dumps({"data": data}, separators=(",", ":"))
+
+
+def chat_event(event_type, data):
+    """
+    Build a channel layer event for a chatroom group.
+
+    Args:
+        event_type (str): The consumer handler type, e.g. "chat.message".
+        data (dict): The data sent to the WebSocket clients.
+
+    Returns:
+        dict: The event, with its pre-encoded ``frame`` when enabled.
+    """
+    event = {"type": event_type, "data": data}
+    if settings.CHAT_PREENCODED_FRAMES:
+        event["frame"] = encode_frame(data)
+    return event
@@ -0,0 +1,110 @@
+"""
+heartbeat.py
+
+This module detects WebSocket clients that stopped answering, e.g. on a
+half-open TCP connection, so their consumers can be closed and removed
+from their channel layer groups instead of receiving every broadcast.
+
+Every CHAT_HEARTBEAT_INTERVAL seconds the consumer sends a ``ping``
+event; a client that sends nothing (``pong`` or anything else) within
+CHAT_HEARTBEAT_TIMEOUT seconds after it is reaped. Clients answer a
+ping with a ``{"purpose": "pong"}`` frame. The heartbeat is off unless
+CHAT_HEARTBEAT_INTERVAL is set, as older clients do not know to answer.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatStats:
+    """
+    Socket counters of the process, for monitoring.
+    """
+
+    def __init__(self):
+        self.live = 0
+        self.reaped = 0
+
+    def snapshot(self):
+        """
+        Get the current counters.
+
+        Returns:
+            dict: The sockets with a running heartbeat and the sockets
+            reaped since the process started.
+        """
+        return {"live_sockets": self.live, "reaped_sockets": self.reaped}
+
+
+stats = HeartbeatStats()
+
+
+class Heartbeat:
+    """
+    Pings one client and reaps it when it stops answering.
+
+    Attributes:
+        ping: Function called to send a ping to the client.
+        reap: Coroutine function called once the client timed out.
+        interval (float): Seconds between pings.
+        timeout (float): Seconds the client has to answer a ping.
+    """
+
+    def __init__(self, ping, reap, interval, timeout):
+        self.ping = ping
+        self.reap = reap
+        self.interval = interval
+        self.timeout = timeout
+        self._last_seen = None
+        self._task = None
+
+    def start(self):
+        """
+        Start pinging the client.
+
+        Returns:
+            None
+        """
+        self._last_seen = asyncio.get_running_loop().time()
+        self._task = asyncio.ensure_future(self._run())
+        stats.live += 1
+
+    def alive(self):
+        """
+        Record that the client just sent something.
+
+        Returns:
+            None
+        """
+        self._last_seen = asyncio.get_running_loop().time()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            pinged_at = loop.time()
+            self.ping()
+            await asyncio.sleep(self.timeout)
+            if self._last_seen < pinged_at:
+                break
+
+        logger.info("Reaping WebSocket silent for %.0fs", loop.time() - self._last_seen)
+        stats.reaped += 1
+        self.stop()
+        await self.reap()
+
+    def stop(self):
+        """
+        Stop pinging the client.
+
+        Returns:
+            None
+        """
+        if self._task is None:
+            return
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+        stats.live -= 1
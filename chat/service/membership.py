@@ -0,0 +1,87 @@
+"""
+membership.py
+
+This module answers whether a user is a member of a chatroom, for
+WebSocket admission and REST authorization alike.
+
+Answers are cached per process for CHAT_MEMBERSHIP_CACHE_TTL seconds.
+Joins and leaves invalidate the cached answer in every process through
+the invalidation bus (see bus.py) once their transaction commits.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from chat.repository.membership import MembershipRepository
+from chat.service.bus import get_bus
+from chat.service.cache import TTLCache
+
+MEMBERSHIP_TOPIC = "membership"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache(
+                settings.CHAT_MEMBERSHIP_CACHE_SIZE,
+                settings.CHAT_MEMBERSHIP_CACHE_TTL,
+            )
+            get_bus().subscribe(MEMBERSHIP_TOPIC, _forget)
+    return _cache
+
+
+def _forget(keys):
+    cache = _get_cache()
+    for chatroom_id, user_id in keys:
+        cache.invalidate((chatroom_id, user_id))
+
+
+def is_member(chatroom_id, user_id):
+    """
+    Check whether a user is a member of a chatroom.
+
+    Args:
+        chatroom_id: The ID of the chatroom.
+        user_id: The ID of the user.
+
+    Returns:
+        bool: True if the user is a member.
+    """
+    cache = _get_cache()
+    key = (int(chatroom_id), int(user_id))
+    member = cache.get(key)
+    if member is None:
+        member = MembershipRepository.exists(*key)
+        cache.set(key, member)
+    return member
+
+
+def invalidate_membership(chatroom_id, user_ids):
+    """
+    Forget the cached membership of users in a chatroom, everywhere.
+
+    Call it in the transaction that changes the membership: the local
+    entry is dropped at once, and again in every process once the
+    transaction commits, so no process keeps the answer read before.
+
+    Args:
+        chatroom_id: The ID of the chatroom.
+        user_ids: IDs of the users whose membership changed.
+
+    Returns:
+        None
+    """
+    keys = [[int(chatroom_id), int(user_id)] for user_id in user_ids]
+    _forget(keys)
+
+    def broadcast():
+        _forget(keys)
+        get_bus().publish(MEMBERSHIP_TOPIC, keys)
+
+    transaction.on_commit(broadcast)
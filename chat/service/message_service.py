@@ -5,31 +5,65 @@ This module provides services related to handling messages in a chatroom.
 """
 
 # Import necessary modules
+from django.conf import settings
+from django.db import transaction
 from chat.entity.chat_models import Attachment, Message, ChatRoom
-from chat.repository.message import MessageRepository
+from chat.repository.message import MessageRepository, save_attachment
+from chat.service.events import record_chat_event
 
-def send_message(content, sender, chatroom):
+def send_message(content, sender, chatroom, attachment=None):
     """
     Send a message to a chatroom.
 
+    The message, its attachment and the event announcing it to the
+    chatroom are written in one transaction (see events.py).
+
     Args:
         content (str): The content of the message.
         sender: The user sending the message.
         chatroom: The chatroom to which the message is sent.
+        attachment: Optional file attached to the message.
 
     Returns:
         The created message object.
     """
-    return MessageRepository.create_message(content, sender, chatroom)
+    with transaction.atomic():
+        message = MessageRepository.create_message(content, sender, chatroom)
+        new_attachment = None
+        if attachment is not None:
+            new_attachment = save_attachment(attachment, message)
+
+        record_chat_event(
+            {
+                "purpose": "new_chat_message",
+                "chat_id": chatroom.id,
+                "message_id": message.id,
+                "message": message.content,
+                "file": new_attachment.file.url
+                if new_attachment is not None
+                else "",
+                "sender": sender.username,
+            }
+        )
+    return message
 
-def list_messages(chatroom):
+def list_messages(chatroom, limit=None, before=None, after=None):
     """
-    List all messages in a given chatroom.
+    List a page of the messages in a given chatroom.
 
     Args:
         chatroom: The chatroom for which to fetch messages.
+        limit: The page size, CHAT_MESSAGE_PAGE_SIZE by default.
+        before: Cursor of the message the page ends before.
+        after: Cursor of the message the page starts after.
 
     Returns:
-        List of message objects.
+        KeysetPage: The message objects, oldest first, and the cursors
+        of the older and newer pages.
     """
-    return MessageRepository.get_messages(chatroom)
+    return MessageRepository.get_messages(
+        chatroom,
+        limit or settings.CHAT_MESSAGE_PAGE_SIZE,
+        before=before,
+        after=after,
+    )
@@ -14,11 +14,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.db import close_old_connections
-from jwt import decode as jwt_decode
 
-from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from chat.service.token_cache import cache_token_user, get_token_user
+from user.models import ClaimsUser
+
 User = get_user_model()
 
 class JWTAuthAsyncMiddleware:
@@ -30,9 +33,8 @@ class JWTAuthAsyncMiddleware:
 
     Methods:
         __call__: Method to call the middleware.
-        get_payload: Method to decode the JWT token and get the payload.
         get_user_credentials: Method to get user credentials from the JWT token payload.
-        get_logged_in_user: Method to get the logged-in user.
+        get_logged_in_user: Method to get the logged-in user, cached per token.
         get_user: Method to get a user by ID.
     """
     def __init__(self, app):
@@ -68,40 +70,19 @@ class JWTAuthAsyncMiddleware:
             raise ValueError("Token not found in query params")
 
         try:
-            # This will automatically validate the token 
-            # and raise an error if the token is invalid
-            UntypedToken(token)
+            # Verify the signature, expiry and type of the token
+            # and decode its claims in a single step
+            access_token = AccessToken(token)
         except (InvalidToken, TokenError) as e:
             # Token is invalid
             return None
         else:
-            # Token is valid, decode it
-            decoded_data = self.get_payload(token)
-
-            # Get the user id from decoded data
-            user_id = self.get_user_credentials(decoded_data)
-
-            # Get the user using ID
-            scope["user"] = await self.get_user(user_id=user_id)
+            # Get the user the token belongs to
+            scope["user"] = await self.get_logged_in_user(access_token)
 
         # Call the wrapped application
         return await self.app(scope, receive, send)
 
-    def get_payload(self, jwt_token):
-        """
-        Decode the JWT token and get the payload.
-
-        Args:
-            jwt_token (str): The JWT token.
-
-        Returns:
-            dict: The decoded payload.
-        """
-        payload = jwt_decode(
-            jwt_token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        return payload
-
     def get_user_credentials(self, payload):
         """
         Get user credentials from the JWT token payload.
@@ -115,17 +96,29 @@ class JWTAuthAsyncMiddleware:
         user_id = payload["user_id"]
         return user_id
 
-    async def get_logged_in_user(self, user_id):
+    async def get_logged_in_user(self, access_token):
         """
-        Get the logged-in user.
+        Get the logged-in user, from the token's claims with
+        CHAT_CLAIMS_AUTH, else from the token cache when the token was
+        seen before.
 
         Args:
-            user_id: The ID of the user.
+            access_token (AccessToken): The verified access token.
 
         Returns:
             User: The logged-in user.
         """
-        user = await self.get_user(user_id)
+        if settings.CHAT_CLAIMS_AUTH and ClaimsUser.has_claims(access_token):
+            user = ClaimsUser.from_claims(access_token)
+            return user if user.is_active else AnonymousUser()
+
+        jti = access_token[api_settings.JTI_CLAIM]
+        user = get_token_user(jti)
+        if user is None:
+            user_id = self.get_user_credentials(access_token.payload)
+            user = await self.get_user(user_id=user_id)
+            if user.is_authenticated:
+                cache_token_user(jti, user, access_token["exp"])
         return user
 
     @database_sync_to_async
@@ -137,12 +130,14 @@ class JWTAuthAsyncMiddleware:
             user_id: The ID of the user.
 
         Returns:
-            User: The user object.
+            User: The user object, or AnonymousUser if the user does not
+            exist or is inactive.
         """
         try:
-            return User.objects.get(id=user_id)
+            user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return AnonymousUser()
+        return user if user.is_active else AnonymousUser()
 
 def JWTAuthMiddlewareStack(app):
     """
@@ -0,0 +1,250 @@
+"""
+outbound.py
+
+This module queues the text frames a WebSocket consumer sends to its
+client.
+
+Clients that connect with ``?batch=1`` opt in to frame coalescing: the
+frames of events arriving within CHAT_FRAME_BATCH_MAX_DELAY_MS of each
+other are sent as one frame holding a JSON array of the events, up to
+CHAT_FRAME_BATCH_MAX_SIZE events per frame. A frame with a single event
+is sent as it is, so batching clients must accept both an event object
+and an array of them.
+
+Every queue is bounded by CHAT_SEND_QUEUE_MAX_SIZE, so a client that
+cannot keep up does not grow the node's memory or hold up other
+sockets. When the queue is full, CHAT_SEND_QUEUE_POLICY decides:
+
+* ``drop_oldest`` drops the oldest ephemeral event (chat messages, which
+  the client can fetch again) to make room,
+* ``resync`` drops every queued ephemeral event and queues a single
+  ``resync_required`` event telling the client to fetch what it missed,
+* ``disconnect`` closes the socket.
+
+Events that change the connection itself (e.g. member removed) are
+never dropped.
+"""
+
+import asyncio
+import logging
+import weakref
+from collections import deque
+
+from chat.service.frames import encode_frame
+
+logger = logging.getLogger(__name__)
+
+RESYNC_FRAME = encode_frame({"purpose": "resync_required"})
+
+OVERFLOW_POLICIES = ("drop_oldest", "resync", "disconnect")
+
+
+class OutboundStats:
+    """
+    Send queue counters of the process, for monitoring.
+    """
+
+    def __init__(self):
+        self.queues = weakref.WeakSet()
+        self.dropped_frames = 0
+        self.resyncs = 0
+        self.disconnects = 0
+
+    def snapshot(self):
+        """
+        Get the current counters.
+
+        Returns:
+            dict: Open queues, queued frames, the deepest queue, and the
+            frames dropped, resyncs sent and sockets closed on overflow.
+        """
+        depths = [queue.depth for queue in list(self.queues)]
+        return {
+            "connections": len(depths),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_frames": self.dropped_frames,
+            "resyncs": self.resyncs,
+            "disconnects": self.disconnects,
+        }
+
+
+stats = OutboundStats()
+
+
+def join_frames(frames):
+    """
+    Combine encoded JSON frames into one frame.
+
+    The frames are already encoded, so they are joined as text rather
+    than decoded and encoded again.
+
+    Args:
+        frames (list): The encoded frames, in send order.
+
+    Returns:
+        str: The lone frame, or a JSON array of all of them.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    return "[" + ",".join(frames) + "]"
+
+
+class OutboundQueue:
+    """
+    Per-connection bounded queue of outgoing frames, sent by a writer
+    task.
+
+    Attributes:
+        batch_size (int): Most frames combined into one WebSocket frame.
+        batch_delay (float): Seconds the writer waits for a batch to
+            fill once a frame is queued.
+        max_size (int): Queued frames that make the queue overflow, or
+            None for no bound.
+        policy (str): What to do on overflow, one of OVERFLOW_POLICIES.
+        on_overflow: Called without arguments when the ``disconnect``
+            policy gives up on the client.
+    """
+
+    def __init__(
+        self,
+        send,
+        batch_size=1,
+        batch_delay=0,
+        max_size=None,
+        policy="drop_oldest",
+        on_overflow=None,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown send queue policy {policy!r}")
+        self._send = send
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_size = max_size
+        self.policy = policy
+        self.on_overflow = on_overflow
+        self._frames = deque()
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        self._writer = None
+        stats.queues.add(self)
+
+    @property
+    def depth(self):
+        """
+        Number of frames waiting to be sent.
+
+        Returns:
+            int: The queue depth.
+        """
+        return len(self._frames)
+
+    def put(self, frame, ephemeral=True):
+        """
+        Queue a frame to be sent, applying the overflow policy when the
+        queue is full.
+
+        Args:
+            frame (str): The encoded frame.
+            ephemeral (bool): Whether the frame may be dropped to keep
+            the queue bounded.
+
+        Returns:
+            None
+        """
+        if self._closing:
+            return
+        full = self.max_size is not None and len(self._frames) >= self.max_size
+        if full and ephemeral and not self._make_room():
+            return
+        self._frames.append((frame, ephemeral))
+        self._ready.set()
+        if len(self._frames) >= self.batch_size:
+            self._full.set()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write())
+
+    def _make_room(self):
+        # Returns whether the new frame should still be queued
+        if self.policy == "drop_oldest":
+            for index, (_, ephemeral) in enumerate(self._frames):
+                if ephemeral:
+                    del self._frames[index]
+                    stats.dropped_frames += 1
+                    break
+            return True
+
+        if self.policy == "resync":
+            kept = [entry for entry in self._frames if not entry[1]]
+            # The new frame is dropped too, the resync covers it
+            stats.dropped_frames += len(self._frames) - len(kept) + 1
+            if (RESYNC_FRAME, False) not in kept:
+                kept.append((RESYNC_FRAME, False))
+                stats.resyncs += 1
+            self._frames = deque(kept)
+            self._ready.set()
+            return False
+
+        stats.dropped_frames += len(self._frames) + 1
+        stats.disconnects += 1
+        self.close()
+        if self.on_overflow is not None:
+            self.on_overflow()
+        return False
+
+    async def _write(self):
+        while True:
+            if not self._frames:
+                if self._closing:
+                    return
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            if len(self._frames) < self.batch_size and not self._closing:
+                # Let the rest of a burst join the batch
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.batch_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            count = min(len(self._frames), self.batch_size)
+            batch = [self._frames.popleft()[0] for _ in range(count)]
+            try:
+                await self._send(join_frames(batch))
+            except Exception:
+                # The socket is gone, so nothing queued can be sent
+                logger.exception("Sending to the client failed, closing its queue")
+                # Detached first, so close() does not cancel this task
+                self._writer = None
+                self.close()
+                return
+
+    async def flush(self):
+        """
+        Send every queued frame and stop the writer.
+
+        Returns:
+            None
+        """
+        self._closing = True
+        if self._writer is not None and not self._writer.done():
+            self._ready.set()
+            self._full.set()
+            await self._writer
+        stats.queues.discard(self)
+
+    def close(self):
+        """
+        Stop the writer and drop the queued frames.
+
+        Returns:
+            None
+        """
+        self._closing = True
+        self._frames.clear()
+        stats.queues.discard(self)
+        if self._writer is not None:
+            self._writer.cancel()
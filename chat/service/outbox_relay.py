@@ -0,0 +1,131 @@
+"""
+outbox_relay.py
+
+This module drains the transactional outbox into RabbitMQ.
+
+Request handlers only write OutboxEvent rows in their own database
+transaction; the relay publishes those rows in id order, in large
+batches, and deletes them once the broker has confirmed them. An event
+is therefore published at least once even if the broker was down when
+it was recorded. Run a single relay to keep events in order; a second
+one only takes over rows the first has not claimed.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import close_old_connections
+
+from chat.repository.outbox import OutboxRepository
+from chat.service.publisher import publish_many
+
+logger = logging.getLogger(__name__)
+
+
+async def publish_batch(payloads):
+    """
+    Publish event payloads, giving up after CHAT_OUTBOX_PUBLISH_TIMEOUT.
+
+    Args:
+        payloads (list): The data of each event.
+
+    Returns:
+        list: One boolean per event, True if the broker confirmed it.
+
+    Raises:
+        asyncio.TimeoutError: If the broker did not answer in time.
+    """
+    return await asyncio.wait_for(
+        publish_many(payloads), settings.CHAT_OUTBOX_PUBLISH_TIMEOUT
+    )
+
+
+def relay_batch():
+    """
+    Publish the oldest batch of outbox events.
+
+    The events are claimed in a short transaction of their own and
+    published outside of it, so a slow broker holds no row locks.
+    Events after the first unconfirmed one are released again, so the
+    next batch resumes in order.
+
+    Returns:
+        int: The number of events published.
+    """
+    events = OutboxRepository.claim_batch(
+        settings.CHAT_OUTBOX_BATCH_SIZE, settings.CHAT_OUTBOX_CLAIM_TTL
+    )
+    if not events:
+        return 0
+
+    published = []
+    try:
+        confirmed = async_to_sync(publish_batch)([event.payload for event in events])
+        for event, is_confirmed in zip(events, confirmed):
+            if not is_confirmed:
+                break
+            published.append(event.id)
+    finally:
+        OutboxRepository.delete_events(published)
+        OutboxRepository.release_events(
+            [event.id for event in events[len(published):]]
+        )
+    return len(published)
+
+
+def retry_delay(failures):
+    """
+    Get how long the relay waits after consecutive failed batches.
+
+    Args:
+        failures (int): The number of consecutive failures.
+
+    Returns:
+        float: Seconds to wait, doubled per failure up to
+        CHAT_OUTBOX_MAX_BACKOFF.
+    """
+    return min(
+        settings.CHAT_OUTBOX_POLL_INTERVAL * 2 ** failures,
+        settings.CHAT_OUTBOX_MAX_BACKOFF,
+    )
+
+
+def run_relay():
+    """
+    Relay outbox events until SIGTERM or SIGINT.
+
+    Returns:
+        None
+    """
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    failures = 0
+    while not stopping:
+        # Replace a connection broken by e.g. a database restart, which
+        # would otherwise fail every batch from then on
+        close_old_connections()
+        try:
+            published = relay_batch()
+            failures = 0
+        except Exception:
+            failures += 1
+            delay = retry_delay(failures)
+            logger.exception("Outbox relay failed, retrying in %.1fs", delay)
+            close_old_connections()
+            time.sleep(delay)
+            continue
+
+        # A full batch means more events are probably waiting
+        if published < settings.CHAT_OUTBOX_BATCH_SIZE:
+            time.sleep(settings.CHAT_OUTBOX_POLL_INTERVAL)
@@ -5,9 +5,11 @@ This module defines WebSocket URL patterns for chat-related operations.
 """
 
 from django.urls import re_path
-from .consumers import ChatConsumer
+from .consumers import ChatConsumer, InboxConsumer
 
 urlpatterns = [
     # Define WebSocket URL pattern for chatroom
     re_path(r"ws/chat/(?P<chatroom_id>\w+)/$", ChatConsumer.as_asgi()),
+    # One socket for all of the user's chatrooms
+    re_path(r"ws/inbox/$", InboxConsumer.as_asgi()),
 ]
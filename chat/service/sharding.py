@@ -0,0 +1,318 @@
+"""
+sharding.py
+
+This module spreads chat event delivery over N subscriber shards.
+
+Chatrooms are hashed onto routing buckets (see topology.py) and the
+buckets are consistent-hashed onto shards, each shard consuming its own
+queue. A room therefore always lands on the same queue, and the queue
+only has a single active consumer, so events of a room stay in order.
+
+The shard layout, a shard count and a generation, is announced on a
+control exchange. Shards adopt a layout of a higher generation only, so
+a shard restarted with an old ``--shards`` value cannot pull the
+cluster back to it: it is told the current layout and adopts it.
+
+Buckets that move are handed over explicitly. The old owner unbinds
+them, drains the events of them already in its queue, then announces
+them released, and only then does the new owner bind them. Events
+published in between are unroutable and returned to the publisher,
+which retries them, so no event is delivered twice or out of order.
+Jump consistent hashing keeps the number of buckets that move to a
+minimum.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+
+from aio_pika import ExchangeType, Message
+from django.conf import settings
+
+from chat.service import topology
+
+logger = logging.getLogger(__name__)
+
+# Type of the message a shard sends through its own queue to find out
+# when everything queued before it has been handled
+DRAIN_MARKER = "shard.drain"
+
+
+class ShardBindings:
+    """
+    Declares and binds the queues of the shards served by this process.
+
+    Attributes:
+        channel: The channel used to declare queues and bindings.
+        exchange: The chat exchange.
+        shards (int): The current number of shards.
+        shard_ids (list): The shards served by this process.
+        generation (int): The generation of the current shard count.
+        dispatcher (KeyedDispatcher): The dispatcher consumed events are
+            handled by, waited for when a queue is drained.
+        queues (dict): The declared queue of each served shard.
+        pending (dict): The buckets of each served shard waiting to be
+            released by their previous owner.
+        joining (bool): Whether the first layout is still being taken
+            over, during which a running cluster's layout is adopted.
+    """
+
+    def __init__(self, channel, exchange, shards, shard_ids, generation=0, dispatcher=None):
+        if not topology.is_routed():
+            raise ValueError("Sharding requires CHAT_EXCHANGE_TYPE = 'topic'")
+        self.channel = channel
+        self.exchange = exchange
+        self.shards = shards
+        self.shard_ids = shard_ids
+        self.generation = generation
+        self.dispatcher = dispatcher
+        self.queues = {}
+        self.pending = {shard_id: set() for shard_id in shard_ids}
+        self.joining = True
+        self._control = None
+        self._drains = {}
+        self._lock = asyncio.Lock()
+        self._timeout = None
+
+    def _owned(self, shards, shard_id):
+        return set(topology.shard_buckets(shards, shard_id))
+
+    async def declare(self):
+        """
+        Declare the queue of every served shard.
+
+        The buckets of the shards are bound once their previous owners
+        released them (see watch), or by ``bind`` directly.
+
+        Returns:
+            list: The declared queues.
+        """
+        for shard_id in self.shard_ids:
+            self.queues[shard_id] = await self.channel.declare_queue(
+                topology.shard_queue_name(shard_id),
+                durable=True,
+                # A second consumer on the same shard stays idle until the
+                # first one goes away, so a room is never processed twice
+                # at the same time.
+                arguments={"x-single-active-consumer": True},
+            )
+            self.pending[shard_id] = self._owned(self.shards, shard_id)
+        return list(self.queues.values())
+
+    async def bind(self, shard_id):
+        """
+        Bind a shard's queue to the buckets it owns and unbind the rest,
+        without waiting for any handover.
+
+        Args:
+            shard_id (int): The shard to bind.
+
+        Returns:
+            None
+        """
+        queue = self.queues[shard_id]
+        owned = self._owned(self.shards, shard_id)
+        for bucket in range(settings.CHAT_ROUTING_BUCKETS):
+            (binding_key,) = topology.binding_keys(buckets=[bucket])
+            if bucket in owned:
+                await queue.bind(self.exchange, routing_key=binding_key)
+            else:
+                await queue.unbind(self.exchange, routing_key=binding_key)
+        self.pending[shard_id] = set()
+
+    async def _bind_buckets(self, shard_id, buckets):
+        # No buckets would mean every event to binding_keys
+        if not buckets:
+            return
+        for binding_key in topology.binding_keys(buckets=sorted(buckets)):
+            await self.queues[shard_id].bind(self.exchange, routing_key=binding_key)
+        self.pending[shard_id] -= buckets
+
+    async def _unbind_buckets(self, shard_id, buckets):
+        if not buckets:
+            return
+        for binding_key in topology.binding_keys(buckets=sorted(buckets)):
+            await self.queues[shard_id].unbind(self.exchange, routing_key=binding_key)
+
+    async def rebalance(self, shards, generation):
+        """
+        Hand the buckets that move over to a new shard count.
+
+        Buckets a served shard loses are unbound and drained, then
+        announced released; buckets it gains are bound once released.
+
+        Args:
+            shards (int): The new number of shards.
+            generation (int): The generation of the new shard count.
+
+        Returns:
+            None
+        """
+        async with self._lock:
+            logger.info(
+                "Rebalancing shards %s: %d -> %d (generation %d)",
+                self.shard_ids, self.shards, shards, generation,
+            )
+            previous, self.shards, self.generation = self.shards, shards, generation
+            released = set()
+            for shard_id in self.shard_ids:
+                before, after = self._owned(previous, shard_id), self._owned(shards, shard_id)
+                self.pending[shard_id] = (self.pending[shard_id] | (after - before)) & after
+                if before - after:
+                    await self._unbind_buckets(shard_id, before - after)
+                    await self.drain(shard_id)
+                    released |= before - after
+            if released:
+                await self._announce("released", buckets=sorted(released))
+            self._expect_releases()
+
+    async def release(self, shards, generation, buckets):
+        """
+        Bind the buckets a previous owner released.
+
+        Args:
+            shards (int): The shard count the buckets were released for.
+            generation (int): The generation of the shard count.
+            buckets (list): The released buckets.
+
+        Returns:
+            None
+        """
+        async with self._lock:
+            if (shards, generation) != (self.shards, self.generation):
+                return
+            for shard_id in self.shard_ids:
+                await self._bind_buckets(shard_id, self.pending[shard_id] & set(buckets))
+            self._expect_releases()
+
+    async def drain(self, shard_id):
+        """
+        Wait until every event already in a shard's queue was handled.
+
+        A marker is sent through the queue behind them; once it is
+        consumed, the dispatcher is waited for (see take_marker).
+
+        Args:
+            shard_id (int): The shard to drain.
+
+        Returns:
+            None
+        """
+        token = uuid.uuid4().hex
+        drained = self._drains[token] = asyncio.get_running_loop().create_future()
+        await self.channel.default_exchange.publish(
+            Message(b"", type=DRAIN_MARKER, correlation_id=token),
+            routing_key=self.queues[shard_id].name,
+        )
+        try:
+            await asyncio.wait_for(drained, settings.CHAT_SHARD_HANDOVER_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Shard %d did not drain in time, releasing anyway", shard_id)
+        finally:
+            self._drains.pop(token, None)
+
+    async def take_marker(self, message):
+        """
+        Consume a drain marker delivered from a shard's queue.
+
+        Args:
+            message (AbstractIncomingMessage): A delivered message.
+
+        Returns:
+            bool: True if the message was a drain marker.
+        """
+        if message.type != DRAIN_MARKER:
+            return False
+        await message.ack()
+        if self.dispatcher is not None:
+            await self.dispatcher.settle()
+        drained = self._drains.get(message.correlation_id)
+        if drained is not None and not drained.done():
+            drained.set_result(None)
+        return True
+
+    def _expect_releases(self):
+        # Buckets whose previous owner does not answer, e.g. because it
+        # is gone, are bound after CHAT_SHARD_HANDOVER_TIMEOUT.
+        if self._timeout is not None:
+            self._timeout.cancel()
+            self._timeout = None
+        if any(self.pending.values()):
+            self._timeout = asyncio.get_running_loop().call_later(
+                settings.CHAT_SHARD_HANDOVER_TIMEOUT,
+                lambda: asyncio.ensure_future(self._take_over()),
+            )
+        else:
+            self.joining = False
+
+    async def _take_over(self):
+        async with self._lock:
+            self._timeout = None
+            for shard_id in self.shard_ids:
+                if self.pending[shard_id]:
+                    logger.warning(
+                        "Shard %d binding %d unreleased bucket(s)",
+                        shard_id, len(self.pending[shard_id]),
+                    )
+                    await self._bind_buckets(shard_id, set(self.pending[shard_id]))
+            self.joining = False
+
+    async def _announce(self, purpose, **data):
+        body = json.dumps(
+            {"purpose": purpose, "shards": self.shards, "generation": self.generation, **data}
+        )
+        await self._control.publish(Message(body.encode()), routing_key="")
+
+    async def watch(self):
+        """
+        Follow shard layout changes and announce our own shard layout.
+
+        Returns:
+            None
+        """
+        self._control = await self.channel.declare_exchange(
+            f"{settings.CHAT_EXCHANGE_NAME}.control", ExchangeType.FANOUT
+        )
+        queue = await self.channel.declare_queue(exclusive=True)
+        await queue.bind(self._control)
+        await queue.consume(self.on_control_message)
+
+        await self._announce("rebalance")
+        self._expect_releases()
+
+    async def on_control_message(self, message):
+        async with message.process():
+            message_obj = json.loads(message.body)
+            if not isinstance(message_obj, dict):
+                return
+            purpose = message_obj.get("purpose")
+            shards = int(message_obj["shards"])
+            generation = int(message_obj.get("generation", 0))
+            if purpose == "released":
+                await self.release(shards, generation, message_obj["buckets"])
+            elif purpose == "rebalance":
+                await self.on_rebalance(shards, generation)
+
+    async def on_rebalance(self, shards, generation):
+        """
+        Adopt an announced shard layout, or refuse a stale one.
+
+        Args:
+            shards (int): The announced number of shards.
+            generation (int): The generation of the shard count.
+
+        Returns:
+            None
+        """
+        if (shards, generation) == (self.shards, self.generation):
+            return
+        if generation > self.generation or (self.joining and generation == self.generation):
+            await self.rebalance(shards, generation)
+            return
+        logger.warning(
+            "Refusing shard count %d of generation %d, keeping %d of generation %d",
+            shards, generation, self.shards, self.generation,
+        )
+        # Tell the stale shard the current layout, so it adopts it
+        await self._announce("rebalance")
@@ -0,0 +1,114 @@
+"""
+supervisor.py
+
+This module runs several subscriber processes side by side, each with
+its own event loop and broker connection, restarting any that crash and
+draining all of them on shutdown.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+from django import db
+from django.conf import settings
+
+from chat.service.subscriber import main
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(worker_kwargs):
+    """
+    Entry point of a subscriber process.
+
+    Args:
+        worker_kwargs (dict): Keyword arguments of ``subscriber.main``.
+
+    Returns:
+        None
+    """
+    # The parent's handlers are inherited through fork; the subscriber
+    # installs its own on the event loop.
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(main(**worker_kwargs))
+
+
+class SubscriberSupervisor:
+    """
+    Forks one subscriber process per worker and keeps them running.
+
+    Attributes:
+        workers (list): The ``subscriber.main`` keyword arguments of
+            each worker process.
+        target: The entry point of the worker processes, called with
+            the keyword arguments of the worker.
+    """
+
+    def __init__(self, workers, target=run_worker):
+        self.workers = workers
+        self.target = target
+        self.processes = {}
+        self.stopping = False
+        self.context = multiprocessing.get_context("fork")
+
+    def start_worker(self, index):
+        # Database connections must not be shared with forked children
+        db.connections.close_all()
+        process = self.context.Process(
+            target=self.target,
+            args=(self.workers[index],),
+            name=f"chat-subscriber-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info("Started subscriber worker %d (pid %d)", index, process.pid)
+
+    def stop(self, signum, frame):
+        """
+        Ask every worker to drain and exit.
+        """
+        self.stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    def run(self):
+        """
+        Start the workers and restart crashed ones until stopped.
+
+        Returns:
+            None
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(len(self.workers)):
+            self.start_worker(index)
+
+        while not self.stopping:
+            wait([process.sentinel for process in self.processes.values()])
+            for index, process in list(self.processes.items()):
+                if process.is_alive() or self.stopping:
+                    continue
+                logger.error(
+                    "Subscriber worker %d exited with code %s, restarting",
+                    index,
+                    process.exitcode,
+                )
+                # Avoid a tight restart loop when a worker fails on start
+                time.sleep(settings.CHAT_SUBSCRIBER_RESTART_DELAY)
+                if not self.stopping:
+                    self.start_worker(index)
+
+        deadline = time.monotonic() + settings.CHAT_SUBSCRIBER_DRAIN_TIMEOUT
+        for index, process in self.processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error("Subscriber worker %d did not drain in time", index)
+                process.kill()
+                process.join()
@@ -0,0 +1,37 @@
+from chat.service.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set('a', True)
+    cache.set('b', False, ttl=5)
+
+    clock.now = 30
+    assert cache.get('a') is True
+    assert cache.get('b') is None
+
+    clock.now = 61
+    assert cache.get('a') is None
+    assert len(cache) == 0
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import pytest
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.db.backends.utils import CursorWrapper
+from chat.entity.chat_models import ChatRoom, Message
+from chat.service.frames import chat_event
+from chat.service.routing import urlpatterns
+from user.models import User
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@pytest.fixture
+def member(db):
+    return User.objects.create_user(email='member@test.com', username='member')
+
+
+@pytest.fixture
+def chatroom(member):
+    room = ChatRoom.objects.create(name='Test Chatroom', admin=member)
+    room.members.add(member)
+    return room
+
+
+def communicator(chatroom, user):
+    ws = WebsocketCommunicator(URLRouter(urlpatterns), f'/ws/chat/{chatroom.id}/')
+    ws.scope['user'] = user
+    return ws
+
+
+@pytest.mark.django_db(transaction=True)
+def test_frames_reuse_the_connection_state(settings, monkeypatch, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    queries = []
+    execute = CursorWrapper.execute
+
+    def record(cursor, sql, params=None):
+        queries.append(sql)
+        return execute(cursor, sql, params)
+
+    async def main():
+        ws = communicator(chatroom, member)
+        connected, _ = await ws.connect()
+        assert connected
+
+        # Queries run on the database thread, so record them on the cursor
+        monkeypatch.setattr(CursorWrapper, 'execute', record)
+        await ws.send_to(text_data=json.dumps(
+            {'purpose': 'send_chat_message', 'message': 'hi'}
+        ))
+        response = json.loads(await ws.receive_from())
+        monkeypatch.undo()
+        await ws.disconnect()
+        return response
+
+    response = asyncio.run(main())
+
+    assert response['data']['sender'] == 'member'
+    assert response['data']['durability'] == 'persisted'
+    assert Message.objects.get().content == 'hi'
+    # Only the INSERT and the chatroom's activity UPDATE, no chatroom lookup
+    assert len(queries) == 2
+    assert queries[0].startswith('INSERT')
+    assert queries[1].startswith('UPDATE "chat_chatroom"')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_non_member_is_rejected(settings, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    outsider = User.objects.create_user(email='outsider@test.com', username='outsider')
+
+    async def main():
+        connected, _ = await communicator(chatroom, outsider).connect()
+        return connected
+
+    assert not asyncio.run(main())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_member_removed_event_closes_the_socket(settings, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+
+    async def main():
+        ws = communicator(chatroom, member)
+        await ws.connect()
+        await get_channel_layer().group_send(f'chat_{chatroom.id}', {
+            'type': 'chat.member_removed',
+            'data': {'purpose': 'member_removed', 'user_id': member.id},
+        })
+        notice = json.loads(await ws.receive_from())
+        closed = await ws.receive_output()
+        return notice, closed
+
+    notice, closed = asyncio.run(main())
+
+    assert notice['data']['purpose'] == 'member_removed'
+    assert closed['type'] == 'websocket.close'
+
+
+def receive_replay(chatroom, member, last_seen_id, count):
+    async def main():
+        ws = WebsocketCommunicator(
+            URLRouter(urlpatterns),
+            f'/ws/chat/{chatroom.id}/?last_seen_id={last_seen_id}',
+        )
+        ws.scope['user'] = member
+        await ws.connect()
+        frames = [json.loads(await ws.receive_from()) for _ in range(count)]
+        await ws.disconnect()
+        return frames
+
+    return asyncio.run(main())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reconnect_replays_only_missed_messages(settings, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    settings.CHAT_RESUME_PAGE_SIZE = 2
+    messages = [
+        Message.objects.create(content=f'm{i}', sender=member, chatroom=chatroom)
+        for i in range(6)
+    ]
+
+    frames = receive_replay(chatroom, member, messages[1].id, 4)
+
+    assert [f['data']['message'] for f in frames] == ['m2', 'm3', 'm4', 'm5']
+    assert [f['data']['message_id'] for f in frames] == [m.id for m in messages[2:]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reconnect_after_a_long_gap_asks_for_resync(settings, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    settings.CHAT_RESUME_MAX_MESSAGES = 3
+    first = Message.objects.create(content='m0', sender=member, chatroom=chatroom)
+    for i in range(1, 6):
+        Message.objects.create(content=f'm{i}', sender=member, chatroom=chatroom)
+
+    (frame,) = receive_replay(chatroom, member, first.id, 1)
+
+    assert frame == {'data': {'purpose': 'resync_required'}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_inbox_multiplexes_the_users_rooms(settings, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    second = ChatRoom.objects.create(name='Second', admin=member)
+    second.members.add(member)
+    other = ChatRoom.objects.create(name='Other', admin=member)
+
+    async def main():
+        ws = WebsocketCommunicator(URLRouter(urlpatterns), '/ws/inbox/')
+        ws.scope['user'] = member
+        await ws.connect()
+        subscribed = json.loads(await ws.receive_from())
+
+        await get_channel_layer().group_send(f'chat_{second.id}', chat_event(
+            'chat.message', {'purpose': 'new_chat_message', 'chat_id': second.id},
+        ))
+        event = json.loads(await ws.receive_from())
+
+        await ws.send_to(text_data=json.dumps({'purpose': 'subscribe', 'chat_id': other.id}))
+        denied = json.loads(await ws.receive_from())
+
+        other_member_added = chat_event(
+            'inbox.subscribe',
+            {'purpose': 'member_added', 'chat_id': other.id, 'user_id': member.id},
+        )
+        await get_channel_layer().group_send(f'user_{member.id}', other_member_added)
+        added = json.loads(await ws.receive_from())
+        await ws.disconnect()
+        return subscribed, event, denied, added
+
+    subscribed, event, denied, added = asyncio.run(main())
+
+    assert subscribed['data']['chat_ids'] == sorted([chatroom.id, second.id])
+    assert event['data']['chat_id'] == second.id
+    assert denied['data'] == {'purpose': 'subscribe_denied', 'chat_id': other.id}
+    assert added['data']['chat_id'] == other.id
+
+
+@pytest.mark.django_db(transaction=True)
+def test_inbox_ignores_frames_that_are_not_json_objects(settings, member, chatroom):
+    settings.CHANNEL_LAYERS = IN_MEMORY_LAYERS
+    other = ChatRoom.objects.create(name='Other', admin=member)
+
+    async def main():
+        ws = WebsocketCommunicator(URLRouter(urlpatterns), '/ws/inbox/')
+        ws.scope['user'] = member
+        await ws.connect()
+        await ws.receive_from()
+
+        for frame in ('not json', '[1, 2]', '"subscribe"', '7'):
+            await ws.send_to(text_data=frame)
+        await ws.send_to(text_data=json.dumps({'purpose': 'subscribe', 'chat_id': other.id}))
+        denied = json.loads(await ws.receive_from())
+        await ws.disconnect()
+        return denied
+
+    denied = asyncio.run(main())
+
+    assert denied['data'] == {'purpose': 'subscribe_denied', 'chat_id': other.id}
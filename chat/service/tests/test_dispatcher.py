@@ -0,0 +1,63 @@
+import asyncio
+from chat.service.dispatcher import KeyedDispatcher
+
+
+def run_dispatcher(items, delays):
+    handled = []
+
+    async def handler(item):
+        key, index = item
+        await asyncio.sleep(delays[key])
+        handled.append(item)
+
+    async def main():
+        dispatcher = KeyedDispatcher(handler)
+        for item in items:
+            dispatcher.submit(item[0], item)
+        await dispatcher.join()
+        assert dispatcher.pending == 0
+
+    asyncio.run(main())
+    return handled
+
+
+def test_items_of_one_key_are_handled_in_order():
+    items = [('slow', i) if i % 2 else ('fast', i) for i in range(10)]
+
+    handled = run_dispatcher(items, {'slow': 0.002, 'fast': 0})
+
+    assert [i for key, i in handled if key == 'slow'] == [1, 3, 5, 7, 9]
+    assert [i for key, i in handled if key == 'fast'] == [0, 2, 4, 6, 8]
+
+
+def test_slow_key_does_not_block_other_keys():
+    items = [('slow', 0), ('fast', 1), ('fast', 2)]
+
+    handled = run_dispatcher(items, {'slow': 0.05, 'fast': 0})
+
+    assert handled == [('fast', 1), ('fast', 2), ('slow', 0)]
+
+
+def test_settle_waits_for_items_submitted_before_it_only():
+    handled = []
+
+    async def handler(item):
+        await asyncio.sleep(0.001)
+        handled.append(item)
+
+    async def main():
+        dispatcher = KeyedDispatcher(handler)
+        for i in range(3):
+            dispatcher.submit('a', ('a', i))
+        dispatcher.submit('b', ('b', 0))
+        settling = asyncio.ensure_future(dispatcher.settle())
+        await asyncio.sleep(0)
+        dispatcher.submit('a', ('a', 3))
+        await settling
+        settled = list(handled)
+        await dispatcher.join()
+        return settled
+
+    settled = asyncio.run(main())
+
+    assert sorted(settled) == [('a', 0), ('a', 1), ('a', 2), ('b', 0)]
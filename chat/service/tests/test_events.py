@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from chat.entity.chat_models import OutboxEvent
+from chat.service import events
+
+PAYLOAD = {'purpose': 'new_chat_message', 'chat_id': 7, 'message_id': 1, 'message': 'hi', 'sender': 'testuser'}
+
+
+class FailingChannelLayer(InMemoryChannelLayer):
+    async def group_send(self, group, message):
+        raise ConnectionError('channel layer down')
+
+
+@pytest.fixture
+def direct_delivery(settings, monkeypatch):
+    settings.CHAT_DELIVERY_MODE = 'direct'
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    published = []
+    monkeypatch.setattr(events, 'publish_buffered', published.append)
+    return published
+
+
+def on_background_loop(coro):
+    return events._direct_delivery.submit(coro).result(timeout=1)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 1
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.django_db
+def test_direct_mode_sends_to_the_channel_layer_on_commit(direct_delivery, django_capture_on_commit_callbacks):
+    layer = get_channel_layer()
+    on_background_loop(layer.group_add('chat_7', 'test.consumer'))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        events.record_chat_event(PAYLOAD)
+
+    message = on_background_loop(layer.receive('test.consumer'))
+    assert message['type'] == 'chat.message'
+    # The outbox copy is flagged so the subscriber skips it
+    assert OutboxEvent.objects.get().payload == {**PAYLOAD, 'direct': True}
+    assert direct_delivery == []
+
+
+def test_failed_direct_send_falls_back_to_the_broker_once(direct_delivery, monkeypatch):
+    monkeypatch.setattr(events, 'get_channel_layer', FailingChannelLayer)
+
+    events.deliver_direct({**PAYLOAD, 'direct': True})
+
+    wait_for(lambda: direct_delivery)
+    time.sleep(0.05)
+    assert direct_delivery == [PAYLOAD]
@@ -0,0 +1,44 @@
+import asyncio
+import json
+from chat.service.consumers import ChatConsumer
+from chat.service.frames import chat_event
+from chat.service.outbound import OutboundQueue
+
+
+class RecordingConsumer(ChatConsumer):
+    def __init__(self):
+        self.sent = []
+        self.outbound = OutboundQueue(self.send_text)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.sent.append(text_data)
+
+
+async def forward(consumer, event):
+    await consumer.chat_message(event)
+    await consumer.outbound.flush()
+
+
+DATA = {'purpose': 'new_chat_message', 'message': 'héllo', 'sender': 'alice'}
+
+
+def test_preencoded_frame_is_forwarded_unchanged(settings):
+    settings.CHAT_PREENCODED_FRAMES = True
+    event = chat_event('chat.message', DATA)
+    consumer = RecordingConsumer()
+
+    asyncio.run(forward(consumer, event))
+
+    assert consumer.sent == [event['frame']]
+    assert json.loads(event['frame']) == {'data': DATA}
+
+
+def test_event_without_frame_is_encoded_by_the_consumer(settings):
+    settings.CHAT_PREENCODED_FRAMES = False
+    event = chat_event('chat.message', DATA)
+    consumer = RecordingConsumer()
+
+    asyncio.run(forward(consumer, event))
+
+    assert 'frame' not in event
+    assert json.loads(consumer.sent[0]) == {'data': DATA}
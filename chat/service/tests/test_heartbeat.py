@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from channels.exceptions import StopConsumer
+from chat.service.consumers import QueuedWebsocketConsumer
+from chat.service.heartbeat import Heartbeat, stats
+
+
+def run_heartbeat(answer, duration=0.1):
+    pings = []
+    reaped = []
+
+    async def main():
+        async def reap():
+            reaped.append(True)
+
+        def ping():
+            pings.append(True)
+            if answer:
+                asyncio.get_running_loop().call_soon(heartbeat.alive)
+
+        heartbeat = Heartbeat(ping, reap, interval=0.01, timeout=0.01)
+        heartbeat.start()
+        await asyncio.sleep(duration)
+        heartbeat.stop()
+
+    asyncio.run(main())
+    return pings, reaped
+
+
+def test_answering_client_is_kept():
+    pings, reaped = run_heartbeat(answer=True)
+
+    assert len(pings) > 1
+    assert reaped == []
+
+
+def test_silent_client_is_reaped_once():
+    reaped_before, live_before = stats.reaped, stats.live
+
+    pings, reaped = run_heartbeat(answer=False)
+
+    assert len(pings) == 1
+    assert reaped == [True]
+    assert stats.reaped == reaped_before + 1
+    assert stats.live == live_before
+
+
+class RecordingConsumer(QueuedWebsocketConsumer):
+    def __init__(self):
+        super().__init__()
+        self.received = []
+        self.disconnects = 0
+
+    async def close(self, code=None):
+        pass
+
+    async def receive(self, text_data=None, bytes_data=None):
+        self.received.append(text_data)
+
+    async def disconnect(self, close_code):
+        self.disconnects += 1
+
+
+def test_only_object_pongs_are_swallowed():
+    consumer = RecordingConsumer()
+    frames = ['{"purpose": "pong"}', '"pong"', '["pong"]', '{"pong"']
+
+    async def main():
+        for frame in frames:
+            await consumer.websocket_receive({'type': 'websocket.receive', 'text': frame})
+
+    asyncio.run(main())
+
+    assert consumer.received == frames[1:]
+
+
+def test_reaped_client_is_torn_down_once():
+    consumer = RecordingConsumer()
+
+    async def main():
+        await consumer.reap()
+        with pytest.raises(StopConsumer):
+            await consumer.websocket_disconnect({'type': 'websocket.disconnect', 'code': 1006})
+
+    asyncio.run(main())
+
+    assert consumer.disconnects == 1
+
+
+def test_heartbeat_is_off_by_default():
+    consumer = RecordingConsumer()
+    consumer.start_heartbeat()
+
+    assert consumer.heartbeat is None
+
+
+def test_heartbeat_starts_once_an_interval_is_set(settings):
+    settings.CHAT_HEARTBEAT_INTERVAL = 0.01
+    consumer = RecordingConsumer()
+
+    async def main():
+        consumer.start_heartbeat()
+        started = consumer.heartbeat is not None
+        consumer.heartbeat.stop()
+        return started
+
+    assert asyncio.run(main())
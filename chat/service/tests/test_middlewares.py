@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from chat.service.middlewares import JWTAuthAsyncMiddleware
+from user.authentication import ClaimsJWTAuthentication
+from user.models import User
+from user.tokens import ChatRefreshToken
+
+
+class CountingMiddleware(JWTAuthAsyncMiddleware):
+    lookups = 0
+
+    def get_user(self, user_id):
+        CountingMiddleware.lookups += 1
+        return super().get_user(user_id)
+
+
+def connect(token):
+    async def accept(scope, receive, send):
+        pass
+
+    scope = {'type': 'websocket', 'headers': [], 'query_string': f'token={token}'.encode()}
+    asyncio.run(CountingMiddleware(accept)(scope, None, None))
+    return scope.get('user')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_token_user_is_looked_up_once_until_blacklisted():
+    user = User.objects.create_user(email='test@test.com', username='testuser')
+    token = str(AccessToken.for_user(user))
+    CountingMiddleware.lookups = 0
+
+    assert connect(token) == user
+    assert connect(token) == user
+    assert CountingMiddleware.lookups == 1
+
+    refresh = RefreshToken.for_user(user)
+    outstanding = OutstandingToken.objects.get(jti=refresh['jti'])
+    BlacklistedToken.objects.create(token=outstanding)
+
+    assert connect(token) == user
+    assert CountingMiddleware.lookups == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalid_token_is_rejected():
+    assert connect('not-a-token') is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_claims_auth_builds_user_without_lookup(settings):
+    settings.CHAT_CLAIMS_AUTH = True
+    user = User.objects.create_user(email='test@test.com', username='testuser')
+    token = str(ChatRefreshToken.for_user(user).access_token)
+    CountingMiddleware.lookups = 0
+
+    claims_user = connect(token)
+
+    assert claims_user == user
+    assert claims_user.username == 'testuser'
+    assert CountingMiddleware.lookups == 0
+
+
+@pytest.mark.django_db
+def test_claims_user_loads_other_fields_in_one_query(settings, django_assert_num_queries):
+    settings.CHAT_CLAIMS_AUTH = True
+    user = User.objects.create_user(email='test@test.com', username='testuser')
+    token = AccessToken(str(ChatRefreshToken.for_user(user).access_token))
+
+    with django_assert_num_queries(0):
+        claims_user = ClaimsJWTAuthentication().get_user(token)
+        assert (claims_user.id, claims_user.username) == (user.id, 'testuser')
+
+    with django_assert_num_queries(1):
+        assert claims_user.email == 'test@test.com'
+        assert claims_user.date_joined == user.date_joined
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deactivated_or_deleted_user_is_not_served_from_cache():
+    user = User.objects.create_user(email='test@test.com', username='testuser')
+    token = str(AccessToken.for_user(user))
+
+    first, second = connect(token), connect(token)
+    assert first == second == user
+    assert first is not second
+
+    user.is_active = False
+    user.save()
+    assert not connect(token).is_authenticated
+
+    user.delete()
+    assert not connect(token).is_authenticated
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from chat.service.outbound import RESYNC_FRAME, OutboundQueue
+
+
+def send_burst(frames, **kwargs):
+    sent = []
+
+    async def send(frame):
+        sent.append(frame)
+
+    async def main():
+        outbound = OutboundQueue(send, **kwargs)
+        for frame in frames:
+            outbound.put(frame)
+        await asyncio.sleep(0.05)
+        await outbound.flush()
+
+    asyncio.run(main())
+    return sent
+
+
+def frame(index):
+    return json.dumps({'data': {'message': index}})
+
+
+def test_burst_is_sent_as_one_array_frame():
+    sent = send_burst([frame(i) for i in range(3)], batch_size=10, batch_delay=0.01)
+
+    assert len(sent) == 1
+    assert [event['data']['message'] for event in json.loads(sent[0])] == [0, 1, 2]
+
+
+def test_batches_are_capped_at_batch_size():
+    sent = send_burst([frame(i) for i in range(5)], batch_size=2, batch_delay=0.01)
+
+    assert [len(json.loads(f)) if f.startswith('[') else 1 for f in sent] == [2, 2, 1]
+    assert sent[-1] == frame(4)
+
+
+def fill_stalled_queue(frames, **kwargs):
+    stalled = asyncio.Event()
+    closed = []
+
+    async def main():
+        outbound = OutboundQueue(
+            lambda frame: stalled.wait(), on_overflow=lambda: closed.append(True), **kwargs
+        )
+        outbound.put('stuck')
+        await asyncio.sleep(0)
+        # The first frame is stuck in send, the rest stay queued
+        for frame, ephemeral in frames:
+            outbound.put(frame, ephemeral=ephemeral)
+        queued = [frame for frame, _ in outbound._frames]
+        outbound.close()
+        return queued
+
+    return asyncio.run(main()), closed
+
+
+def test_drop_oldest_keeps_the_queue_bounded():
+    frames = [(frame(i), True) for i in range(6)]
+
+    queued, _ = fill_stalled_queue(frames, max_size=3, policy='drop_oldest')
+
+    assert queued == [frame(3), frame(4), frame(5)]
+
+
+def test_resync_collapses_ephemeral_frames_into_one_marker():
+    frames = [(frame(i), True) for i in range(4)] + [('control', False)]
+    frames += [(frame(i), True) for i in range(4, 9)]
+
+    queued, _ = fill_stalled_queue(frames, max_size=3, policy='resync')
+
+    assert queued.count(RESYNC_FRAME) == 1
+    assert 'control' in queued
+    assert len(queued) <= 4
+
+
+def test_disconnect_policy_gives_up_on_the_client():
+    frames = [(frame(i), True) for i in range(5)]
+
+    queued, closed = fill_stalled_queue(frames, max_size=2, policy='disconnect')
+
+    assert closed == [True]
+
+
+def test_failed_send_closes_the_queue():
+    async def send(frame):
+        raise ConnectionError('socket gone')
+
+    async def main():
+        outbound = OutboundQueue(send)
+        outbound.put(frame(0))
+        await asyncio.sleep(0.01)
+        outbound.put(frame(1))
+        await outbound.flush()
+        return outbound
+
+    outbound = asyncio.run(main())
+
+    assert outbound.depth == 0
+    assert outbound._writer is None
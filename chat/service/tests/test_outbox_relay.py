@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from django.db import connection
+from chat.entity.chat_models import OutboxEvent
+from chat.service import outbox_relay
+
+
+@pytest.fixture
+def events():
+    return [OutboxEvent.objects.create(payload={'n': n}) for n in range(4)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_confirmed_events_are_deleted_and_the_rest_released(events, monkeypatch):
+    async def publish_many(payloads):
+        # The claim is committed, so no row lock is held while publishing
+        assert not connection.in_atomic_block
+        return [payload['n'] != 2 for payload in payloads]
+
+    monkeypatch.setattr(outbox_relay, 'publish_many', publish_many)
+
+    assert outbox_relay.relay_batch() == 2
+    assert list(OutboxEvent.objects.order_by('id').values_list('payload', 'claimed_until')) == [
+        ({'n': 2}, None),
+        ({'n': 3}, None),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_a_hung_broker_times_out_and_releases_the_batch(events, monkeypatch, settings):
+    settings.CHAT_OUTBOX_PUBLISH_TIMEOUT = 0.05
+
+    async def publish_many(payloads):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(outbox_relay, 'publish_many', publish_many)
+
+    with pytest.raises(asyncio.TimeoutError):
+        outbox_relay.relay_batch()
+    assert OutboxEvent.objects.filter(claimed_until=None).count() == 4
+
+
+def test_retry_delay_backs_off_exponentially(settings):
+    settings.CHAT_OUTBOX_POLL_INTERVAL = 0.1
+    settings.CHAT_OUTBOX_MAX_BACKOFF = 1
+
+    assert [outbox_relay.retry_delay(failures) for failures in range(1, 6)] == [0.2, 0.4, 0.8, 1, 1]
@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+import json
+
+import pytest
+from chat.service.publisher import ChatPublisher
+
+
+class StubPublisher(ChatPublisher):
+    """Records each burst instead of publishing it to the broker."""
+
+    def __init__(self, fail=(), **kwargs):
+        super().__init__(url='amqp://stub', exchange_name='stub', **kwargs)
+        self.fail = set(fail)
+        self.bursts = []
+
+    async def _publish_many(self, messages):
+        self.bursts.append([json.loads(body)['n'] for body, routing_key in messages])
+        return [
+            ConnectionError('not confirmed') if json.loads(body)['n'] in self.fail else None
+            for body, routing_key in messages
+        ]
+
+
+def test_buffered_messages_within_the_window_share_one_burst():
+    publisher = StubPublisher(batch_window_ms=50, batch_max_size=100)
+
+    futures = [publisher.publish_buffered({'n': n}) for n in range(3)]
+
+    assert [future.result(timeout=1) for future in futures] == [True] * 3
+    assert publisher.bursts == [[0, 1, 2]]
+
+
+def test_a_full_batch_is_flushed_without_waiting_for_the_window():
+    publisher = StubPublisher(batch_window_ms=60000, batch_max_size=2)
+
+    full = [publisher.publish_buffered({'n': n}) for n in range(2)]
+    waiting = publisher.publish_buffered({'n': 2})
+
+    assert [future.result(timeout=1) for future in full] == [True, True]
+    assert not waiting.done()
+    assert publisher.bursts == [[0, 1]]
+    asyncio.run(publisher.close())
+    assert waiting.result(timeout=1) is True
+
+
+def test_each_buffered_message_gets_its_own_confirm_result():
+    publisher = StubPublisher(fail={1}, batch_window_ms=10)
+
+    futures = [publisher.publish_buffered({'n': n}) for n in range(3)]
+
+    assert futures[0].result(timeout=1) is True
+    with pytest.raises(ConnectionError):
+        futures[1].result(timeout=1)
+    assert futures[2].result(timeout=1) is True
+
+
+def test_a_cancelled_future_does_not_stop_the_batch_from_resolving():
+    publisher = StubPublisher(batch_window_ms=50)
+
+    futures = [publisher.publish_buffered({'n': n}) for n in range(3)]
+    assert futures[1].cancel()
+
+    assert futures[0].result(timeout=1) is True
+    assert futures[2].result(timeout=1) is True
+    with pytest.raises(concurrent.futures.CancelledError):
+        futures[1].result()
+
+
+def test_publish_many_reports_each_confirm():
+    publisher = StubPublisher(fail={0, 2})
+
+    results = asyncio.run(publisher.publish_many([{'n': n} for n in range(4)]))
+
+    assert results == [False, True, False, True]
+    assert publisher.bursts == [[0, 1, 2, 3]]
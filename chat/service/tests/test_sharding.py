@@ -0,0 +1,182 @@
+import asyncio
+import json
+import re
+from contextlib import asynccontextmanager
+
+import pytest
+from aio_pika import Message
+from chat.service import topology
+from chat.service.dispatcher import KeyedDispatcher
+from chat.service.sharding import ShardBindings
+
+ROOMS = 40
+EVENTS_PER_ROOM = 30
+
+
+class Delivery:
+    def __init__(self, message, routing_key):
+        self.body = message.body
+        self.type = message.type
+        self.correlation_id = message.correlation_id
+        self.routing_key = routing_key
+
+    async def ack(self):
+        pass
+
+    @asynccontextmanager
+    async def process(self):
+        yield
+
+
+class Queue:
+    """A broker queue delivering to its first consumer only, in order."""
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = asyncio.Queue()
+        self.pump = None
+
+    async def bind(self, exchange, routing_key=''):
+        exchange.bindings.add((routing_key, self))
+
+    async def unbind(self, exchange, routing_key=''):
+        exchange.bindings.discard((routing_key, self))
+
+    async def consume(self, callback):
+        if self.pump is None:
+            self.pump = asyncio.ensure_future(self.deliver(callback))
+
+    async def deliver(self, callback):
+        while True:
+            await callback(await self.messages.get())
+
+
+class Exchange:
+    def __init__(self, fanout=False):
+        self.fanout = fanout
+        self.bindings = set()
+
+    def routes(self, binding_key, routing_key):
+        pattern = re.escape(binding_key).replace(r'\*', r'[^.]+').replace(r'\#', r'.*')
+        return self.fanout or re.fullmatch(pattern, routing_key)
+
+    async def publish(self, message, routing_key):
+        queues = {queue for key, queue in self.bindings if self.routes(key, routing_key)}
+        for queue in queues:
+            queue.messages.put_nowait(Delivery(message, routing_key))
+        # Unroutable messages are returned to the publisher
+        return bool(queues)
+
+
+class Broker:
+    def __init__(self):
+        self.queues = {}
+        self.exchanges = {}
+        self.default_exchange = self
+
+    async def publish(self, message, routing_key):
+        self.queues[routing_key].messages.put_nowait(Delivery(message, routing_key))
+
+    async def declare_queue(self, name=None, **kwargs):
+        name = name or f'amq.gen-{len(self.queues)}'
+        return self.queues.setdefault(name, Queue(name))
+
+    async def declare_exchange(self, name, exchange_type, **kwargs):
+        return self.exchanges.setdefault(name, Exchange(fanout=True))
+
+    def close(self):
+        for queue in self.queues.values():
+            if queue.pump is not None:
+                queue.pump.cancel()
+
+
+@pytest.fixture
+def topic_exchange(settings):
+    settings.CHAT_EXCHANGE_TYPE = 'topic'
+    settings.CHAT_ROUTING_BUCKETS = 16
+    settings.CHAT_SHARD_HANDOVER_TIMEOUT = 0.2
+    return settings
+
+
+async def start_shard(broker, exchange, shards, shard_id, handled, generation=0, delay=0.0):
+    async def handler(delivery):
+        await asyncio.sleep(delay)
+        handled.append((shard_id, json.loads(delivery.body)))
+
+    dispatcher = KeyedDispatcher(handler)
+    bindings = ShardBindings(broker, exchange, shards, [shard_id], generation, dispatcher)
+    (queue,) = await bindings.declare()
+    await bindings.watch()
+
+    async def dispatch(delivery):
+        if not await bindings.take_marker(delivery):
+            dispatcher.submit(delivery.routing_key, delivery)
+
+    await queue.consume(dispatch)
+    return bindings
+
+
+async def settled(*bindings):
+    while any(b.joining for b in bindings):
+        await asyncio.sleep(0.01)
+
+
+def test_room_events_stay_in_order_and_unique_across_a_rebalance(topic_exchange):
+    handled = []
+
+    async def main():
+        broker = Broker()
+        exchange = Exchange()
+        # A slow shard, so its queue holds a backlog when it hands over
+        first = await start_shard(broker, exchange, 1, 0, handled, delay=0.005)
+        await settled(first)
+
+        async def publish():
+            for seq in range(EVENTS_PER_ROOM):
+                for room in range(ROOMS):
+                    message = Message(json.dumps({'room': room, 'seq': seq}).encode())
+                    # The publisher retries events returned during a handover
+                    while not await exchange.publish(message, topology.routing_key(room)):
+                        await asyncio.sleep(0.001)
+                await asyncio.sleep(0)
+
+        publishing = asyncio.ensure_future(publish())
+        await asyncio.sleep(0.01)
+        second = await start_shard(broker, exchange, 2, 1, handled, generation=1)
+        await publishing
+        await settled(first, second)
+        while len(handled) < ROOMS * EVENTS_PER_ROOM:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        broker.close()
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert (first.shards, second.shards) == (2, 2)
+    for room in range(ROOMS):
+        events = [(shard_id, event['seq']) for shard_id, event in handled if event['room'] == room]
+        assert [seq for shard_id, seq in events] == list(range(EVENTS_PER_ROOM))
+        # Rooms that moved were handled by the old shard, then the new one
+        shard_ids = [shard_id for shard_id, seq in events]
+        assert shard_ids == sorted(shard_ids)
+    assert {shard_id for shard_id, event in handled} == {0, 1}
+
+
+def test_stale_shard_count_is_refused_and_adopted_by_the_stale_shard(topic_exchange):
+    async def main():
+        broker = Broker()
+        exchange = Exchange()
+        running = [await start_shard(broker, exchange, 2, shard_id, [], generation=1) for shard_id in range(2)]
+        await settled(*running)
+
+        # Restarted with the --shards value of an earlier generation
+        stale = await start_shard(broker, exchange, 1, 0, [], generation=0)
+        await settled(stale)
+        broker.close()
+        return running, stale
+
+    running, stale = asyncio.run(main())
+
+    assert [(b.shards, b.generation) for b in running] == [(2, 1), (2, 1)]
+    assert (stale.shards, stale.generation) == (2, 1)
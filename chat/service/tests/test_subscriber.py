@@ -0,0 +1,90 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from chat.service.subscriber import on_message
+
+
+class FakeMessage:
+    routing_key = ''
+    headers = {}
+
+    def __init__(self, body):
+        self.body = body
+        self.acked = False
+
+    @asynccontextmanager
+    async def process(self, **kwargs):
+        yield
+        self.acked = True
+
+
+class FakeFailures:
+    def __init__(self):
+        self.retried = []
+        self.dead = []
+
+    async def retry(self, message, error):
+        self.retried.append(message)
+
+    async def dead_letter(self, message, reason):
+        self.dead.append(reason)
+
+
+class FailingChannelLayer:
+    async def group_send(self, group, message):
+        raise ConnectionError('channel layer down')
+
+
+def chat_message_body(**overrides):
+    body = {
+        'purpose': 'new_chat_message',
+        'chat_id': 1,
+        'message': 'hi',
+        'sender': 'testuser',
+    }
+    body.update(overrides)
+    return json.dumps(body).encode()
+
+
+def test_malformed_message_is_dead_lettered():
+    failures = FakeFailures()
+    message = FakeMessage(b'not json')
+
+    asyncio.run(on_message(message, failures=failures))
+
+    assert message.acked
+    assert len(failures.dead) == 1 and 'malformed' in failures.dead[0]
+
+
+def test_message_missing_a_key_is_dead_lettered():
+    failures = FakeFailures()
+    message = FakeMessage(json.dumps({'purpose': 'new_chat_message'}).encode())
+
+    asyncio.run(on_message(message, failures=failures))
+
+    assert message.acked
+    assert len(failures.dead) == 1
+
+
+def test_message_that_is_not_an_object_is_dead_lettered():
+    for body in (b'[1]', b'"x"', b'5'):
+        failures = FakeFailures()
+        message = FakeMessage(body)
+
+        asyncio.run(on_message(message, failures=failures))
+
+        assert message.acked
+        assert len(failures.dead) == 1 and 'malformed' in failures.dead[0]
+
+
+def test_failed_send_is_retried():
+    failures = FakeFailures()
+    message = FakeMessage(chat_message_body())
+
+    asyncio.run(
+        on_message(message, channel_layer=FailingChannelLayer(), failures=failures)
+    )
+
+    assert message.acked
+    assert failures.retried == [message]
+    assert failures.dead == []
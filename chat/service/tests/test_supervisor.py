@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from chat.service.supervisor import SubscriberSupervisor
+
+
+def flaky_worker(worker_kwargs):
+    # Crashes on its first start, then runs until told to drain
+    log = worker_kwargs['log']
+
+    def drain(signum, frame):
+        with open(log, 'a') as f:
+            f.write('drained\n')
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, drain)
+    with open(log, 'a') as f:
+        f.write(f'start {time.monotonic()}\n')
+    with open(log) as f:
+        if sum(line.startswith('start') for line in f) == 1:
+            sys.exit(3)
+    while True:
+        time.sleep(0.01)
+
+
+def read_log(log):
+    with open(log) as f:
+        return f.read().splitlines()
+
+
+def test_crashed_worker_is_restarted_after_the_delay_and_drained_on_sigterm(settings, tmp_path):
+    settings.CHAT_SUBSCRIBER_RESTART_DELAY = 0.3
+    log = str(tmp_path / 'worker.log')
+    supervisor = multiprocessing.get_context('fork').Process(
+        target=lambda: SubscriberSupervisor([{'log': log}], target=flaky_worker).run()
+    )
+    supervisor.start()
+
+    deadline = time.monotonic() + 5
+    while len(read_log(log) if os.path.exists(log) else []) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    os.kill(supervisor.pid, signal.SIGTERM)
+    supervisor.join(5)
+
+    starts = [float(line.split()[1]) for line in read_log(log) if line.startswith('start')]
+    assert len(starts) == 2
+    assert starts[1] - starts[0] >= 0.3
+    assert read_log(log)[-1] == 'drained'
+    assert supervisor.exitcode == 0
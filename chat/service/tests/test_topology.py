@@ -0,0 +1,49 @@
+import pytest
+from chat.service import topology
+
+
+@pytest.fixture
+def topic_exchange(settings):
+    settings.CHAT_EXCHANGE_TYPE = 'topic'
+    settings.CHAT_ROUTING_BUCKETS = 16
+    return settings
+
+
+def test_fanout_exchange_uses_empty_routing_key(settings):
+    settings.CHAT_EXCHANGE_TYPE = 'fanout'
+
+    assert topology.routing_key(42) == ''
+    assert topology.binding_keys(chat_ids=[42]) == ['']
+
+
+def test_topic_routing_key_contains_bucket_and_chatroom(topic_exchange):
+    bucket = topology.routing_bucket(42)
+
+    assert 0 <= bucket < 16
+    assert topology.routing_key(42) == f'chat.{bucket}.42'
+    # Ids arriving as strings from URLs route like integer ids
+    assert topology.routing_key('42') == topology.routing_key(42)
+
+
+def test_topic_binding_keys(topic_exchange):
+    assert topology.binding_keys() == ['chat.#']
+    assert topology.binding_keys(chat_ids=[7], buckets=[3]) == [
+        'chat.*.7',
+        'chat.3.*',
+    ]
+
+
+def test_shards_own_every_bucket_exactly_once(topic_exchange):
+    buckets = [
+        bucket
+        for shard_id in range(3)
+        for bucket in topology.shard_buckets(3, shard_id)
+    ]
+
+    assert sorted(buckets) == list(range(16))
+
+
+def test_adding_a_shard_only_moves_buckets_onto_it():
+    for bucket in range(1000):
+        before, after = topology.jump_hash(bucket, 4), topology.jump_hash(bucket, 5)
+        assert after in (before, 4)
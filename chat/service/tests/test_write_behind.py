@@ -0,0 +1,53 @@
+import pytest
+from django.db import InterfaceError
+from chat.service.write_behind import MessageWriteBuffer
+
+
+class RecordingBuffer(MessageWriteBuffer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _save(self, batch):
+        self.batches.append([message.content for message, _ in batch])
+        for message, future in batch:
+            future.set_result(message)
+
+
+class FailingBuffer(MessageWriteBuffer):
+    def _save(self, batch):
+        raise InterfaceError('connection already closed')
+
+
+# Batches are written through database_sync_to_async
+@pytest.mark.django_db
+def test_full_batch_is_written_at_once():
+    buffer = RecordingBuffer(batch_window_ms=60_000, batch_max_size=3)
+
+    futures = [buffer.add(f'message {i}', 1, 1) for i in range(3)]
+
+    assert [future.result(timeout=5).content for future in futures] == [
+        'message 0',
+        'message 1',
+        'message 2',
+    ]
+    assert buffer.batches == [['message 0', 'message 1', 'message 2']]
+
+
+def test_close_writes_the_remaining_messages():
+    buffer = RecordingBuffer(batch_window_ms=60_000, batch_max_size=100)
+
+    future = buffer.add('pending', 1, 1)
+    buffer.close()
+
+    assert future.result(timeout=0).content == 'pending'
+    assert buffer.batches == [['pending']]
+
+
+def test_failed_write_resolves_every_future():
+    buffer = FailingBuffer(batch_window_ms=60_000, batch_max_size=100)
+
+    futures = [buffer.add(f'message {i}', 1, 1) for i in range(2)]
+    buffer.close()
+
+    assert all(isinstance(future.exception(timeout=0), InterfaceError) for future in futures)
@@ -0,0 +1,102 @@
+"""
+token_cache.py
+
+This module caches which user a WebSocket access token belongs to, so
+reconnecting sockets do not look the user up again.
+
+Entries are keyed by the token's ``jti`` and hold the user's id and
+claim fields rather than a model instance, so every connection gets a
+user of its own (see ClaimsUser). They expire after
+CHAT_TOKEN_CACHE_TTL seconds, or when the token itself expires if that
+comes first. Blacklisting one of a user's tokens, or saving or deleting
+the user, drops the cached entries of all of the user's tokens in every
+process through the invalidation bus (see bus.py).
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework_simplejwt.settings import api_settings
+
+from chat.service.bus import get_bus
+from chat.service.cache import TTLCache
+from user.models import ClaimsUser
+
+TOKEN_TOPIC = "token-users"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache(
+                settings.CHAT_TOKEN_CACHE_SIZE, settings.CHAT_TOKEN_CACHE_TTL
+            )
+            get_bus().subscribe(TOKEN_TOPIC, _forget)
+    return _cache
+
+
+def _forget(user_ids):
+    user_ids = set(user_ids)
+    _get_cache().discard_if(
+        lambda jti, claims: claims[api_settings.USER_ID_CLAIM] in user_ids
+    )
+
+
+def get_token_user(jti):
+    """
+    Get the user cached for a token.
+
+    Args:
+        jti (str): The ID of the token.
+
+    Returns:
+        ClaimsUser: A new user built from the cached claims, or None.
+    """
+    claims = _get_cache().get(jti)
+    if claims is None:
+        return None
+    return ClaimsUser.from_claims(claims)
+
+
+def cache_token_user(jti, user, expires_at):
+    """
+    Cache the user a token belongs to until the token expires, at most.
+
+    Args:
+        jti (str): The ID of the token.
+        user: The user the token belongs to.
+        expires_at (int): The ``exp`` claim of the token.
+
+    Returns:
+        None
+    """
+    ttl = min(settings.CHAT_TOKEN_CACHE_TTL, expires_at - time.time())
+    if ttl > 0:
+        _get_cache().set(jti, ClaimsUser.claims_of(user), ttl)
+
+
+def invalidate_user_tokens(user_ids):
+    """
+    Forget the cached tokens of users, everywhere.
+
+    Args:
+        user_ids: IDs of the users whose tokens must be resolved again.
+
+    Returns:
+        None
+    """
+    user_ids = list(user_ids)
+    _forget(user_ids)
+
+    def broadcast():
+        _forget(user_ids)
+        get_bus().publish(TOKEN_TOPIC, user_ids)
+
+    transaction.on_commit(broadcast)
@@ -0,0 +1,146 @@
+"""
+topology.py
+
+This module describes how chat events are routed through RabbitMQ:
+the type of the chat exchange and the routing keys chatroom events are
+published and bound with.
+
+With a ``fanout`` exchange every subscriber receives every event. With
+a ``topic`` exchange each event is published with the routing key
+``chat.<bucket>.<chat_id>``, where ``bucket`` is a stable hash of the
+chatroom id, so a subscriber can bind just the rooms (``chat.*.<id>``)
+or hash buckets (``chat.<bucket>.*``) it serves.
+"""
+
+import zlib
+
+from aio_pika import ExchangeType
+from django.conf import settings
+
+
+def exchange_type():
+    """
+    Get the configured type of the chat exchange.
+
+    Returns:
+        ExchangeType: The exchange type.
+    """
+    return ExchangeType(settings.CHAT_EXCHANGE_TYPE)
+
+
+def is_routed():
+    """
+    Check whether chat events are routed per chatroom.
+
+    Returns:
+        bool: True for a topic exchange, False for a fanout exchange.
+    """
+    return exchange_type() == ExchangeType.TOPIC
+
+
+def routing_bucket(chat_id):
+    """
+    Map a chatroom id onto one of the routing buckets.
+
+    The hash must be stable across processes, so Python's ``hash`` is
+    not used.
+
+    Args:
+        chat_id: The ID of the chatroom.
+
+    Returns:
+        int: The bucket, between 0 and CHAT_ROUTING_BUCKETS - 1.
+    """
+    return zlib.crc32(str(chat_id).encode()) % settings.CHAT_ROUTING_BUCKETS
+
+
+def routing_key(chat_id):
+    """
+    Get the routing key an event of the chatroom is published with.
+
+    Args:
+        chat_id: The ID of the chatroom, or None for events that are
+        not tied to a chatroom.
+
+    Returns:
+        str: The routing key.
+    """
+    if not is_routed():
+        return ""
+    if chat_id is None:
+        return "chat.none"
+    return f"chat.{routing_bucket(chat_id)}.{chat_id}"
+
+
+def binding_keys(chat_ids=None, buckets=None):
+    """
+    Get the keys a subscriber queue should be bound with.
+
+    Args:
+        chat_ids (list): Chatroom ids the subscriber serves.
+        buckets (list): Routing buckets the subscriber serves.
+
+    Returns:
+        list: The binding keys; every event when neither is given.
+    """
+    if not is_routed():
+        return [""]
+    if not chat_ids and not buckets:
+        return ["chat.#"]
+    keys = [f"chat.*.{chat_id}" for chat_id in chat_ids or []]
+    keys += [f"chat.{bucket}.*" for bucket in buckets or []]
+    return keys
+
+
+def jump_hash(key, num_shards):
+    """
+    Jump consistent hash (Lamping & Veach) of a key onto a shard.
+
+    Growing the shard count from N to N + 1 only moves about 1/(N + 1)
+    of the keys, all of them onto the new shard.
+
+    Args:
+        key (int): The key to place.
+        num_shards (int): The number of shards.
+
+    Returns:
+        int: The shard, between 0 and num_shards - 1.
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    shard, candidate = -1, 0
+    while candidate < num_shards:
+        shard = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((shard + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return shard
+
+
+def shard_buckets(shards, shard_id):
+    """
+    Get the routing buckets owned by a shard.
+
+    Args:
+        shards (int): The number of shards.
+        shard_id (int): The shard, between 0 and shards - 1.
+
+    Returns:
+        list: The routing buckets consumed by the shard.
+    """
+    return [
+        bucket
+        for bucket in range(settings.CHAT_ROUTING_BUCKETS)
+        if jump_hash(bucket, shards) == shard_id
+    ]
+
+
+def shard_queue_name(shard_id):
+    """
+    Get the name of the queue a shard consumes.
+
+    Args:
+        shard_id (int): The shard.
+
+    Returns:
+        str: The queue name.
+    """
+    return f"{settings.CHAT_EXCHANGE_NAME}.shard-{shard_id}"
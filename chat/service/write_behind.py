@@ -0,0 +1,175 @@
+"""
+write_behind.py
+
+This module persists chat messages sent over WebSockets in batches.
+
+With CHAT_MESSAGE_WRITE_BEHIND enabled, ``ChatConsumer`` hands each
+message to a process-wide buffer and broadcasts it right away instead
+of waiting for its INSERT. The buffer collects the messages of every
+connection for a short window (or until the batch is full) and writes
+them with one ``bulk_create``. Whatever is still buffered is written
+when the process exits.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+from chat.entity.chat_models import Message
+from chat.repository.message import MessageRepository
+from chat.service.background_loop import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer shared by every consumer of the process.
+
+    Buffering and flush timing run on a background event loop, so any
+    consumer's loop (or thread) can add messages, while the INSERTs run
+    on the database thread pool.
+
+    Attributes:
+        batch_window (float): Seconds a buffered message may wait for
+            others to join its batch.
+        batch_max_size (int): Number of buffered messages that triggers
+            an immediate flush.
+    """
+
+    def __init__(self, batch_window_ms=None, batch_max_size=None):
+        self.batch_window = (
+            batch_window_ms or settings.CHAT_WRITE_BEHIND_WINDOW_MS
+        ) / 1000
+        self.batch_max_size = (
+            batch_max_size or settings.CHAT_WRITE_BEHIND_BATCH_SIZE
+        )
+        self._background = BackgroundLoop(name="chat-write-behind")
+        self._pending = []
+        self._flush_handle = None
+        self._writes = set()
+
+    def add(self, content, sender_id, chatroom_id):
+        """
+        Queue a message for the next batched INSERT.
+
+        Safe to call from any thread.
+
+        Args:
+            content (str): The content of the message.
+            sender_id: The ID of the user sending the message.
+            chatroom_id: The ID of the chatroom the message belongs to.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the saved Message, or
+            raises the database error that kept it from being saved.
+        """
+        future = concurrent.futures.Future()
+        future.add_done_callback(self._log_failure)
+        message = Message(
+            content=content, sender_id=sender_id, chatroom_id=chatroom_id
+        )
+        self._background.loop.call_soon_threadsafe(self._buffer, message, future)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error("Buffered message was not saved: %r", future.exception())
+
+    def _buffer(self, message, future):
+        self._pending.append((message, future))
+        if len(self._pending) >= self.batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._background.loop.call_later(
+                self.batch_window, self._flush
+            )
+
+    def _take_pending(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _flush(self):
+        batch = self._take_pending()
+        if batch:
+            write = asyncio.ensure_future(database_sync_to_async(self._write)(batch))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    def _write(self, batch):
+        try:
+            self._save(batch)
+        except Exception as e:
+            # Anything else, e.g. an InterfaceError from a lost database
+            # connection, must still resolve every future, or the
+            # senders waiting on them would hang.
+            logger.exception("Batch of %d messages was not saved", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _save(self, batch):
+        try:
+            MessageRepository.bulk_create_messages([m for m, _ in batch])
+        except DatabaseError:
+            # One bad row (e.g. its chatroom was deleted meanwhile) must
+            # not lose the rest of the batch, so retry row by row.
+            logger.warning("Batch of %d messages failed, saving one by one", len(batch))
+            for message, future in batch:
+                try:
+                    MessageRepository.save_message(message)
+                except DatabaseError as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(message)
+            return
+        for message, future in batch:
+            future.set_result(message)
+
+    async def _drain(self):
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        return self._take_pending()
+
+    def close(self):
+        """
+        Write every buffered message and wait for in-flight writes.
+
+        The last batch is written on the calling thread, since the
+        database thread pool no longer takes work at interpreter exit.
+
+        Returns:
+            None
+        """
+        batch = self._background.run_sync(self._drain())
+        if batch:
+            self._write(batch)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_message_buffer():
+    """
+    Return the process-wide write buffer, creating it on first use.
+
+    Returns:
+        MessageWriteBuffer: The shared buffer.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = MessageWriteBuffer()
+            atexit.register(_buffer.close)
+    return _buffer
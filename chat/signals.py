@@ -0,0 +1,103 @@
+"""
+signals.py
+
+This module connects chat model signals to the chat event pipeline.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from chat.entity.chat_models import ChatRoom, Message
+from chat.repository.message import MessageRepository
+from chat.service.events import record_chat_event
+from chat.service.token_cache import invalidate_user_tokens
+from user.models import User
+
+
+@receiver(post_delete, sender=ChatRoom)
+def chatroom_deleted(sender, instance, **kwargs):
+    """
+    Tell the deleted chatroom's WebSocket consumers to close.
+
+    Args:
+        sender: The ChatRoom model.
+        instance (ChatRoom): The deleted chatroom.
+
+    Returns:
+        None
+    """
+    record_chat_event({"purpose": "chatroom_deleted", "chat_id": instance.id})
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, **kwargs):
+    """
+    Stop trusting the cached WebSocket tokens of the token's user.
+
+    Args:
+        sender: The BlacklistedToken model.
+        instance (BlacklistedToken): The blacklist entry.
+
+    Returns:
+        None
+    """
+    user_id = instance.token.user_id
+    if user_id is not None:
+        invalidate_user_tokens([user_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Stop trusting the cached WebSocket tokens of a user who was changed,
+    e.g. deactivated, or deleted.
+
+    Args:
+        sender: The User model.
+        instance (User): The saved or deleted user.
+        created (bool): Whether the user was just created.
+        update_fields (frozenset): The fields saved, if restricted.
+
+    Returns:
+        None
+    """
+    # A new user has no cached tokens, and logging in only saves last_login
+    if created or update_fields == frozenset({"last_login"}):
+        return
+    invalidate_user_tokens([instance.id])
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Note the chatrooms whose latest message is one of the user's, as
+    the user's messages are deleted with them.
+
+    Args:
+        sender: The User model.
+        instance (User): The user being deleted.
+
+    Returns:
+        None
+    """
+    instance.led_chatroom_ids = MessageRepository.chatrooms_led_by(
+        Message.objects.filter(sender=instance)
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """
+    Move the activity of the chatrooms whose latest message was the
+    deleted user's back to their latest message left.
+
+    Args:
+        sender: The User model.
+        instance (User): The deleted user.
+
+    Returns:
+        None
+    """
+    MessageRepository.rewind_activity(getattr(instance, "led_chatroom_ids", ()))
@@ -1,7 +1,7 @@
 # chat/urls.py
 from django.urls import path
 
-from chat.controller import chatroom_controller, message_controller
+from chat.controller import chatroom_controller, message_controller, stats_controller
 
 urlpatterns = [
     path(
@@ -24,6 +24,11 @@ urlpatterns = [
         chatroom_controller.ChatRoomEnterView.as_view(),
         name="enter_chatroom",
     ),
+    path(
+        "chatrooms/<int:chatroom_id>/members/",
+        chatroom_controller.ChatRoomMemberListView.as_view(),
+        name="list_chatroom_members",
+    ),
     path(
         "chatrooms/<int:chatroom_id>/messages/",
         message_controller.MessageListView.as_view(),
@@ -34,5 +39,15 @@ urlpatterns = [
         message_controller.SendMessageView.as_view(),
         name="send_message",
     ),
+    path(
+        "stats/send-queues/",
+        stats_controller.SendQueueStatsView.as_view(),
+        name="send_queue_stats",
+    ),
+    path(
+        "stats/connections/",
+        stats_controller.ConnectionStatsView.as_view(),
+        name="connection_stats",
+    ),
 ]
 
@@ -0,0 +1,182 @@
+"""
+pagination.py
+
+This module provides keyset (cursor) pagination over querysets.
+
+A page is read with a condition on the ordering key of the last row the
+client saw, e.g. ``(created_at, id) < (cursor_created_at, cursor_id)``,
+instead of an OFFSET, so its cost depends on the page size only and not
+on how deep into the results it is. Cursors are opaque strings encoding
+the key of a row.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# A page of rows, oldest first, with the cursors to read the rows
+# before and after it, or None when there are none.
+KeysetPage = namedtuple("KeysetPage", ["items", "before", "after"])
+
+
+def encode_cursor(values):
+    """
+    Encode the key of a row into a cursor.
+
+    Args:
+        values (tuple): The values of the key fields of the row.
+
+    Returns:
+        str: The cursor.
+    """
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """
+    Decode a cursor into the key of a row.
+
+    Args:
+        cursor (str): The cursor.
+        size (int): The number of key fields.
+
+    Returns:
+        list: The values of the key fields.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """
+    Parse the page size requested by a client.
+
+    Args:
+        value (str): The requested page size, or None.
+        default (int): The page size when none is requested.
+        maximum (int): The largest page size allowed.
+
+    Returns:
+        int: The page size, between 1 and ``maximum``.
+
+    Raises:
+        ValueError: If the page size is not a positive integer.
+    """
+    if value in (None, ""):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError(f"Invalid page size: {value!r}")
+    return min(limit, maximum)
+
+
+def _keyset_condition(keys, values, lookup):
+    # (k1, k2, ...) < (v1, v2, ...) expanded into
+    # k1 < v1 OR (k1 = v1 AND k2 < v2) OR ...
+    conditions = []
+    for i, key in enumerate(keys):
+        equal = {prefix: value for prefix, value in zip(keys[:i], values)}
+        conditions.append(Q(**equal, **{f"{key}__{lookup}": values[i]}))
+    # The redundant k1 <= v1 bound lets the database range-scan an index
+    # on the key, which it cannot do from the OR alone.
+    bound = Q(**{f"{keys[0]}__{lookup}e": values[0]})
+    return bound & reduce(lambda left, right: left | right, conditions)
+
+
+def _cursor_value(field, value):
+    # encode_cursor writes integers as is and everything else, e.g.
+    # datetimes, as strings, so anything else was not made by it.
+    converted = field.to_python(value)
+    if isinstance(converted, int):
+        valid = type(value) is int
+    else:
+        valid = isinstance(value, str)
+    if not valid:
+        raise TypeError(f"Invalid {field.name}: {value!r}")
+    return converted
+
+
+def _filter_by_cursor(queryset, keys, cursor, lookup):
+    values = decode_cursor(cursor, len(keys))
+    opts = queryset.model._meta
+    try:
+        values = [
+            _cursor_value(opts.get_field(key), value) for key, value in zip(keys, values)
+        ]
+    except (TypeError, ValueError, ValidationError) as e:
+        # A well-formed cursor whose values do not fit the key fields
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    return queryset.filter(_keyset_condition(keys, values, lookup))
+
+
+def _key(row, keys):
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(getattr(row, key) for key in keys)
+
+
+def paginate(queryset, keys, limit, before=None, after=None, first=False):
+    """
+    Read one page of a queryset ordered by a unique key.
+
+    Without a cursor the last page, i.e. the newest rows, is read, or
+    the first page with ``first``.
+
+    Args:
+        queryset (QuerySet): The rows to paginate.
+        keys (tuple): The fields of the key, ending with a unique one,
+            e.g. ``("created_at", "id")``.
+        limit (int): The maximum number of rows in the page.
+        before (str): Cursor of the row the page ends before.
+        after (str): Cursor of the row the page starts after.
+        first (bool): Whether to read the first page when no cursor
+            is given.
+
+    Returns:
+        KeysetPage: The page.
+
+    Raises:
+        ValueError: If a cursor is malformed or both are given.
+    """
+    if before is not None and after is not None:
+        raise ValueError("Only one of before and after can be given")
+
+    if after is not None or (first and before is None):
+        if after is not None:
+            queryset = _filter_by_cursor(queryset, keys, after, "gt")
+        rows = list(queryset.order_by(*keys)[: limit + 1])
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        older = after if not items else encode_cursor(_key(items[0], keys))
+        return KeysetPage(
+            items,
+            before=older if after is not None else None,
+            after=encode_cursor(_key(items[-1], keys)) if has_more else None,
+        )
+
+    if before is not None:
+        queryset = _filter_by_cursor(queryset, keys, before, "lt")
+    rows = list(queryset.order_by(*(f"-{key}" for key in keys))[: limit + 1])
+    has_more = len(rows) > limit
+    items = rows[:limit][::-1]
+    newer = before if not items else encode_cursor(_key(items[-1], keys))
+    return KeysetPage(
+        items,
+        before=encode_cursor(_key(items[0], keys)) if has_more else None,
+        after=newer if before is not None else None,
+    )
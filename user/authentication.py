@@ -0,0 +1,31 @@
+"""
+authentication.py
+
+This module defines the JWT authentication of REST requests.
+"""
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from user.models import ClaimsUser
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that, with CHAT_CLAIMS_AUTH enabled, builds
+    ``request.user`` from the token's claims instead of querying the
+    user. Tokens minted without the claims are authenticated as usual.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.CHAT_CLAIMS_AUTH or not ClaimsUser.has_claims(
+            validated_token
+        ):
+            return super().get_user(validated_token)
+
+        user = ClaimsUser.from_claims(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -1,9 +1,10 @@
 # your_app_name/models.py
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
 from phonenumber_field.modelfields import PhoneNumberField
 from django.utils.translation import gettext_lazy as _
 import uuid
+from rest_framework_simplejwt.settings import api_settings
 from chat.mixins import TimeStampMixin
 
 
@@ -56,3 +57,76 @@ class User(AbstractUser, TimeStampMixin):
                 + str(uuid.uuid4()).split("-")[-1]
             )
         super(User, self).save(*args, **kwargs)
+
+
+class ClaimsUser(User):
+    """
+    A user built from the claims of an access token, without a query.
+
+    Only the fields in CLAIM_FIELDS are set; the others are deferred and
+    are all loaded by a single query the first time any of them is read.
+    """
+
+    # Fields copied into access tokens, besides the user id
+    CLAIM_FIELDS = ("username", "is_active")
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def has_claims(cls, token):
+        """
+        Check whether a token carries the claims a ClaimsUser needs.
+
+        Args:
+            token: The validated access token.
+
+        Returns:
+            bool: True if every claim field is in the token.
+        """
+        return all(field in token for field in cls.CLAIM_FIELDS)
+
+    @classmethod
+    def claims_of(cls, user):
+        """
+        Get the claims a ClaimsUser of a user is built from.
+
+        Args:
+            user (User): The user.
+
+        Returns:
+            dict: The user id and the CLAIM_FIELDS of the user.
+        """
+        claims = {field: getattr(user, field) for field in cls.CLAIM_FIELDS}
+        claims[api_settings.USER_ID_CLAIM] = getattr(user, api_settings.USER_ID_FIELD)
+        return claims
+
+    @classmethod
+    def from_claims(cls, token):
+        """
+        Build the user a token belongs to from the token's claims.
+
+        Args:
+            token: The validated access token.
+
+        Returns:
+            ClaimsUser: The user, with the fields outside the claims
+            deferred.
+        """
+        values = {field: token[field] for field in cls.CLAIM_FIELDS}
+        values[api_settings.USER_ID_FIELD] = token[api_settings.USER_ID_CLAIM]
+        field_names = [
+            field.attname
+            for field in cls._meta.concrete_fields
+            if field.attname in values
+        ]
+        return cls.from_db(
+            DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names]
+        )
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and set(fields) <= deferred:
+            # Load every field missing from the claims at once
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields)
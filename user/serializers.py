@@ -118,6 +118,7 @@ from rest_framework_simplejwt.serializers import (
     TokenObtainPairSerializer,
 )
 from rest_framework_simplejwt.tokens import RefreshToken
+from user.tokens import ChatRefreshToken
 from django.conf import settings
 from django.db.models import Q
 from phonenumber_field.serializerfields import PhoneNumberField
@@ -162,6 +163,11 @@ class UserLoginSerializer(TokenObtainPairSerializer):
 
     auth_serializer = UserSerializer  # declare user serializer to be included in login response
 
+    @classmethod
+    def get_token(cls, user):
+        """Overriding to add the chat claims to the tokens"""
+        return ChatRefreshToken.for_user(user)
+
     def __init__(self, *args, **kwargs):
         """Overriding to change the error messages."""
         super(UserLoginSerializer, self).__init__(*args, **kwargs)
@@ -0,0 +1,24 @@
+"""
+tokens.py
+
+This module defines the JWTs issued to users at login and registration.
+"""
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import ClaimsUser
+
+
+class ChatRefreshToken(RefreshToken):
+    """
+    Refresh token whose claims, which its access tokens inherit, include
+    the user fields the chat paths read, so those paths can authenticate
+    without loading the user (see ClaimsUser).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in ClaimsUser.CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
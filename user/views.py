@@ -12,7 +12,7 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.template.loader import get_template
 from django.core.mail import EmailMultiAlternatives
-from rest_framework_simplejwt.tokens import RefreshToken
+from user.tokens import ChatRefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from drf_spectacular.utils import extend_schema, extend_schema_view
@@ -98,7 +98,7 @@ class UserRegisterView(APIView):
             user.save()
 
             # Generate authentication credentials
-            refresh = RefreshToken.for_user(user)
+            refresh = ChatRefreshToken.for_user(user)
             data = {
                 "user": UserSerializer(user).data,
                 "credentials": {
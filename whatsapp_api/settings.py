@@ -210,7 +210,7 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': ('chat.utils.renderers.CustomResponseRenderer',),
     'EXCEPTION_HANDLER': 'chat.utils.validation.custom_exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ),
@@ -321,6 +321,7 @@ RABBITMQ_HOST = '127.0.0.1'
 RABBITMQ_PORT = 5672
 RABBITMQ_USER = os.getenv('RABBITMQ_USER')
 RABBITMQ_PASS = os.getenv('RABBITMQ_PASS')
+RABBITMQ_URL = f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}:{RABBITMQ_PORT}/"
 
 CHANNEL_LAYERS = {
     "default": {
@@ -332,5 +333,87 @@ CHANNEL_LAYERS = {
 }
 
 
-
-
+# Chat publisher settings
+CHAT_EXCHANGE_NAME = "whatsapp_chat"
+# "fanout" delivers every event to every subscriber; "topic" routes events
+# by chatroom (see chat/service/topology.py). An existing exchange cannot
+# change type, so pick a new CHAT_EXCHANGE_NAME when switching.
+CHAT_EXCHANGE_TYPE = "fanout"
+CHAT_ROUTING_BUCKETS = 256  # hash buckets chatroom routing keys are spread over
+CHAT_PUBLISHER_MAX_CONNECTIONS = 2  # long-lived broker connections per process
+CHAT_PUBLISHER_MAX_CHANNELS = 16  # pooled channels with the exchange declared
+CHAT_PUBLISHER_BATCH_WINDOW_MS = 5  # how long a buffered publish waits for company
+CHAT_PUBLISHER_BATCH_MAX_SIZE = 256  # buffered publishes that trigger an early flush
+
+# Chat subscriber settings
+CHAT_SUBSCRIBER_PREFETCH = 64  # unacked messages in flight per subscriber channel
+CHAT_SUBSCRIBER_RESTART_DELAY = 1  # seconds before a crashed worker is restarted
+CHAT_SUBSCRIBER_DRAIN_TIMEOUT = 30  # seconds workers get to finish in-flight messages
+CHAT_SUBSCRIBER_MAX_RETRIES = 5  # delivery attempts before a message is dead-lettered
+CHAT_SUBSCRIBER_RETRY_BASE_DELAY_MS = 1000  # first retry delay, doubled per attempt
+CHAT_SHARD_HANDOVER_TIMEOUT = 10  # seconds a shard waits for moved buckets to be released
+
+# "broker" delivers REST-sent chat events to WebSockets through RabbitMQ and
+# the subscriber; "direct" sends them straight to the channel layer.
+CHAT_DELIVERY_MODE = "broker"
+
+# Chat outbox relay settings
+CHAT_OUTBOX_BATCH_SIZE = 500  # events published per relay batch
+CHAT_OUTBOX_POLL_INTERVAL = 0.1  # seconds the relay waits when the outbox is drained
+CHAT_OUTBOX_PUBLISH_TIMEOUT = 10  # seconds a batch may take to be confirmed by the broker
+CHAT_OUTBOX_CLAIM_TTL = 60  # seconds claimed events stay reserved to their relay; above the publish timeout
+CHAT_OUTBOX_MAX_BACKOFF = 30  # seconds the relay waits at most after repeated failures
+
+# Chat write-behind settings
+# Save WebSocket messages in batches after broadcasting them; broadcasts
+# then carry "durability": "buffered" instead of "persisted".
+CHAT_MESSAGE_WRITE_BEHIND = False
+CHAT_WRITE_BEHIND_WINDOW_MS = 50  # how long a buffered message waits for company
+CHAT_WRITE_BEHIND_BATCH_SIZE = 500  # buffered messages that trigger an early flush
+
+# Chat membership cache settings
+CHAT_MEMBERSHIP_CACHE_SIZE = 100000  # (chatroom, user) answers cached per process
+CHAT_MEMBERSHIP_CACHE_TTL = 60  # seconds a cached answer is trusted without an invalidation
+
+# Chat broadcast settings
+# Encode each group event's WebSocket frame once (with orjson when it is
+# installed) instead of once per connected consumer.
+CHAT_PREENCODED_FRAMES = False
+# Clients connecting with ?batch=1 get events that arrive close together
+# as one frame holding a JSON array of them.
+CHAT_FRAME_BATCH_MAX_DELAY_MS = 5  # how long an event waits for others to join its frame
+CHAT_FRAME_BATCH_MAX_SIZE = 50  # events that trigger an early send
+CHAT_SEND_QUEUE_MAX_SIZE = 1000  # frames queued per WebSocket before the policy applies
+# What a full send queue does: "drop_oldest" chat messages, "resync" (drop
+# them and ask the client to refetch) or "disconnect" the client.
+CHAT_SEND_QUEUE_POLICY = "resync"
+
+# Chat resume settings, for sockets reconnecting with ?last_seen_id=<id>
+CHAT_RESUME_PAGE_SIZE = 100  # missed messages read per keyset query
+CHAT_RESUME_MAX_MESSAGES = 1000  # missed messages beyond which the client must resync
+
+# Chat heartbeat settings
+CHAT_HEARTBEAT_INTERVAL = 0  # seconds between pings to each WebSocket client; 0 turns pings off
+CHAT_HEARTBEAT_TIMEOUT = 10  # seconds a client has to answer before it is reaped
+
+# Chat WebSocket token cache settings
+CHAT_TOKEN_CACHE_SIZE = 10000  # access tokens whose user is cached per process
+CHAT_TOKEN_CACHE_TTL = 300  # seconds a token's user is cached, capped at its expiry
+
+# Authenticate REST requests and WebSockets from the username and is_active
+# claims of access tokens, without loading the user; a deactivated user
+# keeps access until their access token expires.
+CHAT_CLAIMS_AUTH = False
+
+# Message history pages, read with keyset cursors on (created_at, id)
+CHAT_MESSAGE_PAGE_SIZE = 50  # messages per page when no limit is given
+CHAT_MESSAGE_PAGE_MAX_SIZE = 200  # largest limit a client may ask for
+
+# Chatroom member pages, read with keyset cursors on the user id
+CHAT_MEMBER_PAGE_SIZE = 100  # members per page when no limit is given
+CHAT_MEMBER_PAGE_MAX_SIZE = 500  # largest limit a client may ask for
+
+# Inbox pages (the chatroom list), most recently active chatroom first
+CHAT_INBOX_PAGE_SIZE = 50  # chatrooms per page when no limit is given
+CHAT_INBOX_PAGE_MAX_SIZE = 200  # largest limit a client may ask for
+CHAT_INBOX_PREVIEW_LENGTH = 100  # characters of the latest message shown